@@ -20,6 +20,32 @@ from diagram_generator.backend.utils.diagram_validator import DiagramValidator,
 
 logger = logging.getLogger(__name__)
 
+_VALID_DIAGRAM_TYPES = frozenset(t.value for t in DiagramType)
+
+# Lowercased first-line markers of diagram code in a raw LLM response
+_MERMAID_STARTERS = (
+    "graph ", "flowchart ", "sequencediagram", "classdiagram",
+    "erdiagram", "mindmap", "gantt", "pie", "statediagram"
+)
+_PLANTUML_STARTERS = ("@startuml", "@startmindmap", "@startgantt")
+# Example type for each lowercased Mermaid declaration keyword
+_MERMAID_DECLARATION_TYPES = {
+    "graph": "flowchart",
+    "flowchart": "flowchart",
+    "sequencediagram": "sequence",
+    "classdiagram": "class",
+    "statediagram": "state",
+    "erdiagram": "er",
+    "mindmap": "mindmap",
+    "gantt": "gantt",
+}
+
+def _check_diagram_type(diagram_type: str) -> None:
+    """Raise ValueError for an unsupported diagram type before any LLM work."""
+    if not isinstance(diagram_type, str) or diagram_type.lower() not in _VALID_DIAGRAM_TYPES:
+        valid_types = [t.value for t in DiagramType]
+        raise ValueError(f"Invalid diagram_type. Must be one of: {valid_types}")
+
 # Pydantic models for the agent
 class DiagramAgentState(BaseModel):
     """Represents the state of the diagram agent."""
@@ -117,14 +143,23 @@ Preserve the exact structure while only fixing the validation errors."""
         self.ollama = OllamaAPI(base_url=base_url)
         self.logger = logging.getLogger(__name__)
 
+    async def aclose(self) -> None:
+        """Release the pooled HTTP connections to Ollama."""
+        await self.ollama.close()
+
     async def _determine_requirements(
         self, 
         description: str, 
         diagram_type: DiagramType,
         rag_directory: Optional[str] = None,
-        existing_diagram: Optional[str] = None
+        existing_diagram: Optional[str] = None,
+        rag_provider: Optional[RAGProvider] = None
     ) -> Dict[str, Any]:
-        """Analyze prompt and determine diagram requirements."""
+        """Analyze prompt and determine diagram requirements.
+
+        A ``rag_provider`` that has already loaded ``rag_directory`` is reused
+        as-is, so its documents are not read and embedded a second time.
+        """
         requirements = {
             "description": description,
             "diagram_type": diagram_type,
@@ -135,23 +170,29 @@ Preserve the exact structure while only fixing the validation errors."""
         # Load RAG context if directory provided
         if rag_directory:
             try:
-                log_info(f"Setting up RAG with directory: {rag_directory}")
-                rag_config = DiagramGenerationOptions().rag
-                rag_config.api_doc_dir = rag_directory
-                rag_config.enabled = True
-                
-                # Ensure RAG config has necessary attributes
-                if not hasattr(rag_config, 'similarity_threshold'):
-                    log_info("Adding default similarity_threshold to RAG config")
-                    # Don't modify the config object directly, we'll let RAGProvider handle defaults
+                if rag_provider and rag_provider.loaded_directory == os.path.abspath(rag_directory):
+                    log_info(f"Reusing RAG documents already loaded from: {rag_directory}")
+                    success = True
+                else:
+                    log_info(f"Setting up RAG with directory: {rag_directory}")
+                    rag_config = DiagramGenerationOptions().rag
+                    rag_config.api_doc_dir = rag_directory
+                    rag_config.enabled = True
                     
-                rag_provider = RAGProvider(
-                    config=rag_config,
-                    ollama_base_url=self.ollama.base_url
-                )
-                
-                # Get relevant context from code (modified to support async call)
-                success = await rag_provider.load_docs_from_directory(rag_directory, use_simple_file_splitting=True)
+                    # Ensure RAG config has necessary attributes
+                    if not hasattr(rag_config, 'similarity_threshold'):
+                        log_info("Adding default similarity_threshold to RAG config")
+                        # Don't modify the config object directly, we'll let RAGProvider handle defaults
+                        
+                    rag_provider = RAGProvider(
+                        config=rag_config,
+                        ollama_base_url=self.ollama.base_url,
+                        # Manifests live beside the rest of this agent's data
+                        cache_dir=str(self.storage.base_path / "rag_cache")
+                    )
+                    
+                    # Get relevant context from code (modified to support async call)
+                    success = await rag_provider.load_docs_from_directory(rag_directory, use_simple_file_splitting=True)
                 
                 if success:
                     log_info(f"RAG Provider Stats: {rag_provider.stats.model_dump_json(indent=2)}")
@@ -484,18 +525,11 @@ The code context contains the actual implementation that your diagram should acc
         def is_valid_diagram_starter(line: str) -> bool:
             """Check if a line is a valid diagram starter.""" 
             line = line.lower().strip()
-            # Mermaid starters
-            if any(line.startswith(starter) for starter in [
-                "graph ", "flowchart ", "sequencediagram", "classdiagram",
-                "erdiagram", "mindmap", "gantt", "pie", "statediagram"
-            ]):
+            if line.startswith(_MERMAID_STARTERS):
                 return True
-            # PlantUML starters
-            if any(starter in line for starter in [
-                "@startuml", "@startmindmap", "@startgantt"
-            ]):
-                return True
-            return False
+            # Every PlantUML starter contains "@start", so most lines are
+            # rejected by this one scan
+            return "@start" in line and any(starter in line for starter in _PLANTUML_STARTERS)
 
         lines = raw_content.split('\n')
         start_idx = None
@@ -629,6 +663,8 @@ The code context contains the actual implementation that your diagram should acc
         rag_provider: Optional[RAGProvider] = None,
     ) -> DiagramAgentOutput:
         """Generate a diagram with validation and fixing."""
+        _check_diagram_type(diagram_type)
+
         if not options:
             options = DiagramGenerationOptions()
 
@@ -646,7 +682,7 @@ The code context contains the actual implementation that your diagram should acc
         )
 
         # Run the agent
-        output = await self.run_agent(input_data)
+        output = await self.run_agent(input_data, rag_provider=rag_provider)
 
         return output
 
@@ -667,11 +703,7 @@ The code context contains the actual implementation that your diagram should acc
             raise ValueError("update_notes cannot be empty")
             
         # Validate diagram_type
-        try:
-            DiagramType(diagram_type.lower())
-        except ValueError:
-            valid_types = [t.value for t in DiagramType]
-            raise ValueError(f"Invalid diagram_type. Must be one of: {valid_types}")
+        _check_diagram_type(diagram_type)
             
         if not options:
             options = DiagramGenerationOptions()
@@ -701,11 +733,15 @@ Please update the diagram according to these changes while preserving the overal
         )
 
         # Run the agent with the augmented description
-        output = await self.run_agent(input_data)
+        output = await self.run_agent(input_data, rag_provider=rag_provider)
 
         return output
 
-    async def run_agent(self, input_data: DiagramAgentInput) -> DiagramAgentOutput:
+    async def run_agent(
+        self,
+        input_data: DiagramAgentInput,
+        rag_provider: Optional[RAGProvider] = None
+    ) -> DiagramAgentOutput:
         """Run the diagram agent to generate and validate a diagram."""
         # Initialize options if not provided
         options = input_data.options or DiagramGenerationOptions()
@@ -721,7 +757,8 @@ Please update the diagram according to these changes while preserving the overal
         requirements = await self._determine_requirements(
             state.description,
             state.diagram_type,
-            rag_directory=rag_directory
+            rag_directory=rag_directory,
+            rag_provider=rag_provider
         )
         state.requirements = requirements
         state.rag_provider = requirements.get("rag_provider")
@@ -817,45 +854,34 @@ Please update the diagram according to these changes while preserving the overal
         from .diagram_examples import DiagramTypeExamples
         
         # Determine if it's mermaid or plantuml from the code
-        syntax_type = 'plantuml' if '@startuml' in code or '@startmindmap' in code or '@startgantt' in code else 'mermaid'
+        syntax_type = 'plantuml' if any(tag in code for tag in _PLANTUML_STARTERS) else 'mermaid'
         
         # Detect specific diagram type by examining first line or structure
-        first_line = code.split('\n')[0].lower()
+        first_line = code.split('\n', 1)[0].lower()
         if syntax_type == 'mermaid':
-            if 'graph' in first_line or 'flowchart' in first_line:
-                specific_type = 'flowchart'
-            elif 'sequencediagram' in first_line:
-                specific_type = 'sequence'
-            elif 'classdiagram' in first_line:
-                specific_type = 'class'
-            elif 'statediagram' in first_line:
-                specific_type = 'state'
-            elif 'erdiagram' in first_line:
-                specific_type = 'er'
-            elif 'mindmap' in first_line:
-                specific_type = 'mindmap'
-            elif 'gantt' in first_line:
-                specific_type = 'gantt'
-            else:
-                specific_type = 'flowchart'  # default
+            # The declaration is the first token, e.g. "graph" or "stateDiagram-v2"
+            tokens = first_line.split(None, 1)
+            declaration = tokens[0].split('-', 1)[0] if tokens else ''
+            specific_type = _MERMAID_DECLARATION_TYPES.get(declaration, 'flowchart')
         else:  # plantuml
+            code_lower = code.lower()
             if '@startmindmap' in first_line:
                 specific_type = 'mindmap'
-            elif '@startgantt' in first_line or 'project' in code.lower():
+            elif '@startgantt' in first_line or 'project' in code_lower:
                 specific_type = 'gantt'
-            elif 'class' in code.lower():
+            elif 'class' in code_lower:
                 specific_type = 'class'
-            elif 'state' in code.lower():
+            elif 'state' in code_lower:
                 specific_type = 'state'
-            elif 'actor' in code.lower() or 'usecase' in code.lower():
+            elif 'actor' in code_lower or 'usecase' in code_lower:
                 specific_type = 'usecase'
-            elif 'component' in code.lower():
+            elif 'component' in code_lower:
                 specific_type = 'component'
-            elif 'entity' in code.lower():
+            elif 'entity' in code_lower:
                 specific_type = 'er'
-            elif 'participant' in code.lower() or '->' in code:
+            elif 'participant' in code_lower or '->' in code:
                 specific_type = 'sequence'
-            elif 'activity' in code.lower():
+            elif 'activity' in code_lower:
                 specific_type = 'activity'
             else:
                 specific_type = 'sequence'  # default
@@ -53,6 +53,10 @@ Source diagram:
 """
         }
 
+    async def aclose(self) -> None:
+        """Release the agent's pooled HTTP connections to Ollama."""
+        await self.diagram_agent.aclose()
+
     async def generate_diagram(
         self,
         description: str,
@@ -3,6 +3,7 @@
 import os
 import sys
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -28,10 +29,17 @@ if 'PYTHONPATH' not in os.environ:
     sys.path.insert(0, python_path)
     logger.info(f"Development mode: Added {python_path} to PYTHONPATH")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close pooled HTTP connections to Ollama when the server shuts down."""
+    yield
+    await diagrams.diagram_generator.aclose()
+
 app = FastAPI(
     title="LLM Diagram Generator",
     description="API for generating and managing diagrams using LLMs",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,5 +1,6 @@
 """Pydantic models for Ollama API interactions."""
 
+import asyncio
 import logging
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field
@@ -44,7 +45,39 @@ class OllamaAPI:
     
     def __init__(self, base_url: str = "http://localhost:11434"):
         self.base_url = base_url.rstrip("/")
+        self._session = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
         
+    async def _get_session(self):
+        """Return the pooled HTTP session, creating it on first use.
+
+        The session is bound to the running event loop, so a new one is
+        created if the previous session was closed or belongs to another
+        loop; a session left over from another loop is closed first.
+        """
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            await self.close()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session, if one is open."""
+        if self._session is not None and not self._session.closed:
+            try:
+                await self._session.close()
+            except RuntimeError as e:
+                # Connections opened on an event loop that has since closed
+                # cannot be shut down cleanly; they are already unusable
+                logger.debug(f"Discarding HTTP session from a closed event loop: {e}")
+        self._session = None
+        self._session_loop = None
+
     def _build_url(self, endpoint: str) -> str:
         """Build full URL for API endpoint."""
         return f"{self.base_url}/api/{endpoint}"
@@ -58,8 +91,6 @@ class OllamaAPI:
     ) -> Union[OllamaResponse, ErrorResponse]:
         """Generate a response using the Ollama API."""
         try:
-            import aiohttp
-            
             request_data = {
                 "model": model,
                 "prompt": prompt,
@@ -70,21 +101,21 @@ class OllamaAPI:
             request_data = {k: v for k, v in request_data.items() if v is not None}
             request = OllamaRequest(**request_data)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self._build_url("generate"),
-                    json=request.model_dump(exclude_none=True)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Ollama API error: {error_text}")
-                        return ErrorResponse(
-                            error=f"Ollama API returned {response.status}: {error_text}",
-                            code=response.status
-                        )
-                    
-                    result = await response.json()
-                    return OllamaResponse(**result)
+            session = await self._get_session()
+            async with session.post(
+                self._build_url("generate"),
+                json=request.model_dump(exclude_none=True)
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Ollama API error: {error_text}")
+                    return ErrorResponse(
+                        error=f"Ollama API returned {response.status}: {error_text}",
+                        code=response.status
+                    )
+                
+                result = await response.json()
+                return OllamaResponse(**result)
                     
         except Exception as e:
             logger.exception("Error calling Ollama API")
@@ -93,10 +124,9 @@ class OllamaAPI:
     async def health_check(self) -> bool:
         """Check if Ollama API is available."""
         try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self._build_url("version")) as response:
-                    return response.status == 200
+            session = await self._get_session()
+            async with session.get(self._build_url("version")) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Ollama health check failed: {e}")
             return False
@@ -21,16 +21,27 @@ class OllamaService:
         self.base_url = base_url
         self.model = model
         self.cache_expire_after = cache_expire_after
+        self._session: Optional[requests.Session] = None
 
-        # Configure session with retries
-        self.session = requests.Session()
-        retries = Retry(
-            total=3,
-            backoff_factor=0.5,
-            status_forcelist=[500, 502, 503, 504]
-        )
-        self.session.mount('http://', HTTPAdapter(max_retries=retries))
-        self.session.mount('https://', HTTPAdapter(max_retries=retries))
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session with retries, created on first use.
+
+        The service is instantiated at import time by the API routers, so
+        deferring the session keeps importing the app free of connection
+        pool setup until a request is actually made.
+        """
+        if self._session is None:
+            session = requests.Session()
+            retries = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[500, 502, 503, 504]
+            )
+            session.mount('http://', HTTPAdapter(max_retries=retries))
+            session.mount('https://', HTTPAdapter(max_retries=retries))
+            self._session = session
+        return self._session
 
     def health_check(self) -> bool:
         """Check if Ollama service is available."""
@@ -9,6 +9,7 @@ from typing import Dict, List, Optional, Set, Tuple, Any
 
 from pydantic import BaseModel
 import traceback
+from contextlib import contextmanager
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -69,6 +70,7 @@ class Storage:
             config: Storage configuration
         """
         self.index = {"diagrams": {}, "conversations": {}, "logs": []}
+        self._defer_index = False
         self.config = config
         self.base_path = Path(config.data_dir)
         self.diagrams_path = self.base_path / config.diagrams_dir
@@ -108,7 +110,12 @@ class Storage:
         return default_index
         
     def _save_index(self) -> None:
-        """Save storage index to disk (excluding logs)."""
+        """Save storage index to disk (excluding logs).
+
+        Skipped inside bulk_writes(); the index is written once on exit.
+        """
+        if self._defer_index:
+            return
         try:
             # Create a copy of the index without logs
             persistent_index = {
@@ -120,6 +127,24 @@ class Storage:
             logger.error(f"Failed to save index file: {str(e)}", exc_info=True)
             raise StorageError("Failed to save index file")
     
+    @contextmanager
+    def bulk_writes(self):
+        """Defer index writes until the block exits.
+
+        Records are still written as they are saved; only the shared
+        index.json is held back, so N saves cost one index write.
+        Nested blocks flush when the outermost one exits.
+        """
+        if self._defer_index:
+            yield self
+            return
+        self._defer_index = True
+        try:
+            yield self
+        finally:
+            self._defer_index = False
+            self._save_index()
+
     def log_exception(self, message:str, exception: Exception) -> None:
         """Log an exception to the storage layer.
         
@@ -320,19 +345,19 @@ class Storage:
             # Get all diagram IDs first
             diagram_ids = list(self.index["diagrams"].keys())
             
-            # Delete each diagram and its associated conversations
-            for diagram_id in diagram_ids:
-                # Delete associated conversations first
-                conv_ids = self.get_diagram_history(diagram_id)
-                for conv_id in conv_ids:
-                    self.delete_conversation(conv_id)
+            with self.bulk_writes():
+                # Delete each diagram and its associated conversations
+                for diagram_id in diagram_ids:
+                    # Delete associated conversations first
+                    conv_ids = self.get_diagram_history(diagram_id)
+                    for conv_id in conv_ids:
+                        self.delete_conversation(conv_id)
+                    
+                    # Then delete the diagram
+                    self.delete_diagram(diagram_id)
                 
-                # Then delete the diagram
-                self.delete_diagram(diagram_id)
-            
-            # Clear index entries
-            self.index["diagrams"].clear()
-            self._save_index()
+                # Clear index entries
+                self.index["diagrams"].clear()
 
         except Exception as e:
             self.log_exception(f"Failed to clear diagrams: {str(e)}", e)
@@ -1,32 +1,61 @@
 """Caching utilities for diagram generation."""
 
 import hashlib
+import heapq
 import json
+import logging
+import os
+import sys
+import tempfile
+import threading
 import time
+import weakref
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional, TypeVar, Generic
+from typing import Any, Dict, List, Optional, Tuple, TypeVar, Generic
+
+from pydantic_core import from_json, to_json
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
-@dataclass
+# __slots__ via dataclass needs Python 3.10; older interpreters get a
+# plain frozen dataclass
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_SLOTS)
 class CacheEntry(Generic[T]):
-    """Cache entry with value and metadata."""
+    """Cache entry with value and metadata.
+    
+    Immutable and, where supported, slotted: caches hold many entries and
+    share them between readers without copying.
+    """
     value: T
     timestamp: float
     ttl: Optional[float] = None
     metadata: Dict[str, Any] = None
 
-    def is_valid(self) -> bool:
+    def is_valid(self, now: Optional[float] = None) -> bool:
         """Check if the cache entry is still valid.
         
+        Args:
+            now: Current time on the same clock as ``timestamp``. Defaults
+                to ``time.time()``, the clock used for persisted entries.
+                Callers checking many entries should read the clock once
+                and pass it in.
+        
         Returns:
             bool: Whether the entry is valid
         """
         if self.ttl is None:
             return True
             
-        return time.time() < (self.timestamp + self.ttl)
+        if now is None:
+            now = time.time()
+        return now < (self.timestamp + self.ttl)
 
     def to_dict(self) -> Dict:
         """Convert entry to dictionary format.
@@ -58,17 +87,368 @@ class CacheEntry(Generic[T]):
             metadata=data.get("metadata", {})
         )
 
+class _CacheShard:
+    """One lock-striped partition of a Cache."""
+    
+    __slots__ = ("store", "lock")
+    
+    def __init__(self):
+        self.store: Dict[str, CacheEntry] = {}
+        self.lock = threading.Lock()
+
+class Cache(Generic[T]):
+    """Thread-safe in-memory cache with optional per-entry TTL.
+    
+    Entries are timestamped with ``time.monotonic()`` so expiry is not
+    affected by wall-clock adjustments. Entries never leave the process,
+    so the monotonic clock is always comparable.
+    
+    Keys are spread over a fixed number of shards, each with its own lock,
+    so writers to different keys rarely contend. Writers update a shard's
+    dict in place under its lock; ``get`` takes no lock, since a single
+    dict lookup is atomic in CPython.
+    
+    Entries with a TTL are also pushed onto a min-heap keyed by expiry time.
+    Writes pop whatever has expired from the front of the heap, so stale
+    entries are reclaimed without scanning the whole cache. Reads still
+    check expiry, so an entry is never served past its TTL even if no
+    write has run since.
+    
+    With ``maxsize`` set, the least recently used entries are evicted once
+    the cache grows past it. Recency is tracked in one ordered index, so
+    hits on a bounded cache take a short lock; unbounded caches skip the
+    bookkeeping and keep reads lock-free.
+    """
+    
+    SHARD_COUNT = 16  # Must be a power of two
+    
+    def __init__(self, default_ttl: Optional[float] = None, maxsize: Optional[int] = None):
+        """Initialize the cache.
+        
+        Args:
+            default_ttl: Time-to-live in seconds for entries set without one
+            maxsize: Maximum number of entries (unbounded if None)
+        """
+        self.default_ttl = default_ttl
+        self.maxsize = maxsize
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._shards = [_CacheShard() for _ in range(self.SHARD_COUNT)]
+        self._shard_mask = self.SHARD_COUNT - 1
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._heap_lock = threading.Lock()
+        
+    def _shard(self, key: str) -> _CacheShard:
+        """Get the shard owning a key."""
+        return self._shards[hash(key) & self._shard_mask]
+        
+    def get(self, key: str, default: Optional[T] = None) -> Optional[T]:
+        """Get a cached value.
+        
+        Args:
+            key: Cache key
+            default: Value to return if the key is missing or expired
+            
+        Returns:
+            The cached value, or ``default``
+        """
+        shard = self._shard(key)
+        # Lock-free read: one dict lookup is atomic
+        entry = shard.store.get(key)
+        if entry is None:
+            return default
+        if not entry.is_valid(time.monotonic()):
+            self._discard(shard, key, entry)
+            return default
+        if self.maxsize is not None:
+            with self._lru_lock:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+        return entry.value
+        
+    def _discard(self, shard: _CacheShard, key: str, entry: CacheEntry[T]) -> None:
+        """Drop an expired entry unless it has been replaced since it was read."""
+        with shard.lock:
+            if shard.store.get(key) is not entry:
+                return
+            del shard.store[key]
+        self._forget(key)
+        
+    def _remove(self, shard: _CacheShard, key: str) -> bool:
+        """Remove a key from its shard. Caller must not hold the shard lock."""
+        with shard.lock:
+            return shard.store.pop(key, None) is not None
+            
+    def _forget(self, key: str) -> None:
+        """Drop a key from the recency index of a bounded cache."""
+        if self.maxsize is not None:
+            with self._lru_lock:
+                self._lru.pop(key, None)
+            
+    def set(
+        self,
+        key: str,
+        value: T,
+        ttl: Optional[float] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Cache a value.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Optional time-to-live in seconds (falls back to default_ttl)
+            metadata: Optional metadata
+        """
+        entry = CacheEntry(
+            value=value,
+            timestamp=time.monotonic(),
+            ttl=ttl if ttl is not None else self.default_ttl,
+            metadata=metadata
+        )
+        shard = self._shard(key)
+        with shard.lock:
+            shard.store[key] = entry
+            
+        with self._heap_lock:
+            if entry.ttl is not None:
+                heapq.heappush(self._expiry_heap, (entry.timestamp + entry.ttl, key))
+            self._evict_expired(entry.timestamp)
+            
+        if self.maxsize is not None:
+            with self._lru_lock:
+                self._lru[key] = None
+                self._lru.move_to_end(key)
+                while len(self._lru) > self.maxsize:
+                    oldest, _ = self._lru.popitem(last=False)
+                    self._remove(self._shard(oldest), oldest)
+            
+    def _evict_expired(self, now: float) -> int:
+        """Pop expired keys off the expiry heap and drop their entries.
+        
+        The heap may hold stale items for keys that were overwritten or
+        deleted; those are skipped unless the current entry has also
+        expired. Caller must hold ``_heap_lock``.
+        
+        Args:
+            now: Current monotonic time
+            
+        Returns:
+            int: Number of entries removed
+        """
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            shard = self._shard(key)
+            entry = shard.store.get(key)
+            if entry is not None and not entry.is_valid(now):
+                self._discard(shard, key, entry)
+                removed += 1
+        return removed
+            
+    def delete(self, key: str) -> bool:
+        """Remove a cached value.
+        
+        Args:
+            key: Cache key
+            
+        Returns:
+            bool: Whether an entry was removed
+        """
+        removed = self._remove(self._shard(key), key)
+        self._forget(key)
+        return removed
+            
+    def purge_expired(self) -> int:
+        """Remove all expired entries.
+        
+        Returns:
+            int: Number of entries removed
+        """
+        with self._heap_lock:
+            return self._evict_expired(time.monotonic())
+        
+    def clear(self) -> int:
+        """Remove all cached values.
+        
+        Returns:
+            int: Number of entries removed
+        """
+        count = 0
+        with self._heap_lock:
+            self._expiry_heap = []
+            for shard in self._shards:
+                with shard.lock:
+                    count += len(shard.store)
+                    shard.store.clear()
+            with self._lru_lock:
+                self._lru.clear()
+        return count
+        
+    def __len__(self) -> int:
+        """Number of stored entries, including any not yet purged."""
+        return sum(len(shard.store) for shard in self._shards)
+
+@lru_cache(maxsize=1024)
+def _hash_cache_key(
+    description: str,
+    diagram_type: str,
+    rag_context: Optional[str],
+    params: str
+) -> str:
+    """Hash normalized cache inputs, memoized for repeated lookups.
+    
+    A get/set/invalidate cycle for one diagram hashes the same inputs
+    several times; this keeps that to one digest.
+    
+    Args:
+        description: Diagram description
+        diagram_type: Type of diagram
+        rag_context: Optional RAG context
+        params: Additional parameters as canonical JSON
+        
+    Returns:
+        str: Cache key
+    """
+    # Keys only identify inputs, so the faster BLAKE2b with a 128-bit
+    # digest is plenty; it also keeps cache file names short. Parts are fed
+    # to the hasher one at a time rather than joined into one large string
+    # first, with NUL separators so ("ab", "c") and ("a", "bc") differ.
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in (
+        description.strip(),
+        diagram_type.lower(),
+        rag_context.strip() if rag_context else "",
+        params
+    ):
+        hasher.update(part.encode())
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+def _write_entries(cache_dir: str, entries: Dict[str, CacheEntry]) -> int:
+    """Write buffered cache entries to disk and empty the buffer.
+    
+    Module-level so a finalizer can call it without keeping the owning
+    cache alive. Entries are taken from the buffer one at a time, so
+    concurrent flushes share the work instead of writing the same entries;
+    an entry whose write fails is put back before the error propagates.
+    
+    Args:
+        cache_dir: Directory for cache files
+        entries: Buffered entries by cache key
+        
+    Returns:
+        int: Number of entries written
+    """
+    count = 0
+    while entries:
+        try:
+            key, entry = entries.popitem()
+        except KeyError:
+            break
+        # Write beside the target and rename over it, so readers never see
+        # a partially written file. Each write gets its own temporary file,
+        # so concurrent writers of one key never rename each other's.
+        cache_path = f"{cache_dir}{os.sep}{key}.json"
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f"{key}.", suffix=".json.tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(to_json(entry.to_dict()))
+            os.replace(tmp_path, cache_path)
+        except FileNotFoundError:
+            if not os.path.isdir(cache_dir):
+                entries.setdefault(key, entry)
+                raise
+            # clear() removed the temporary file mid-write, so the entry is
+            # gone as if written just before the clear
+            continue
+        except OSError:
+            entries.setdefault(key, entry)
+            raise
+        count += 1
+    return count
+
+def _flush_at_exit(cache_dir: str, entries: Dict[str, CacheEntry]) -> None:
+    """Finalizer for DiagramCache: write what is still buffered.
+    
+    Runs during garbage collection or interpreter exit, where an exception
+    could not be handled, so a cache directory that has since been removed
+    or become unwritable only costs the unwritten entries.
+    
+    Args:
+        cache_dir: Directory for cache files
+        entries: Buffered entries by cache key
+    """
+    try:
+        _write_entries(cache_dir, entries)
+    except OSError as e:
+        logger.warning(f"Dropped {len(entries)} unwritten diagram cache entries: {e}")
+
+def _remove_file(path: str) -> bool:
+    """Delete a file if it exists.
+    
+    Args:
+        path: File path
+        
+    Returns:
+        bool: Whether a file was removed
+    """
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+
 class DiagramCache:
-    """Cache for diagram generation results."""
+    """Cache for diagram generation results.
+    
+    Files on disk are the durable tier. Entries this instance has written
+    or read are also kept in memory, so repeat lookups skip the file read
+    and JSON parse. Changes made to the directory by another process are
+    not seen for keys already held in memory.
+    
+    By default every ``set`` is written to disk before it returns. A
+    ``flush_threshold`` above 1 buffers new entries and writes them in
+    batches, trading durability for fewer writes: anything still buffered
+    is written by ``flush()``, on garbage collection or at interpreter
+    exit, but up to ``flush_threshold - 1`` entries are lost if the process
+    is killed or crashes first.
     
-    def __init__(self, cache_dir: str = ".cache/diagrams"):
+    The in-memory copies are capped at ``max_hot_entries``, least recently
+    used first out; evicted entries are read back from disk when needed.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: str = ".cache/diagrams",
+        flush_threshold: int = 1,
+        max_hot_entries: int = 256
+    ):
         """Initialize diagram cache.
         
         Args:
             cache_dir: Directory for cache files
+            flush_threshold: Number of buffered entries that triggers a
+                write to disk (1 writes every entry immediately)
+            max_hot_entries: Maximum entries kept in memory
         """
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Hot paths build file paths as plain strings rather than Path objects
+        self._cache_dir_str = str(self.cache_dir)
+        self.flush_threshold = max(1, flush_threshold)
+        self._hot: Cache[CacheEntry[str]] = Cache(maxsize=max_hot_entries)
+        self._pending: Dict[str, CacheEntry[str]] = {}
+        self._finalizer = weakref.finalize(self, _flush_at_exit, self._cache_dir_str, self._pending)
+        
+    def flush(self) -> int:
+        """Write all buffered entries to disk.
+        
+        Returns:
+            int: Number of entries written
+        """
+        return _write_entries(self._cache_dir_str, self._pending)
         
     def _get_cache_key(
         self,
@@ -88,28 +468,25 @@ class DiagramCache:
         Returns:
             str: Cache key
         """
-        # Create deterministic string from inputs
-        key_parts = [
-            description.strip(),
-            diagram_type.lower(),
-            rag_context.strip() if rag_context else "",
+        return _hash_cache_key(
+            description,
+            # A handful of type names recur on every call; interned, the
+            # memo lookup compares them by identity
+            sys.intern(diagram_type),
+            rag_context,
             json.dumps(kwargs, sort_keys=True)
-        ]
-        key_string = "|".join(key_parts)
-        
-        # Generate hash
-        return hashlib.sha256(key_string.encode()).hexdigest()
+        )
         
-    def _get_cache_path(self, key: str) -> Path:
+    def _get_cache_path(self, key: str) -> str:
         """Get file path for cache key.
         
         Args:
             key: Cache key
             
         Returns:
-            Path: Cache file path
+            str: Cache file path
         """
-        return self.cache_dir / f"{key}.json"
+        return f"{self._cache_dir_str}{os.sep}{key}.json"
         
     def get(
         self,
@@ -132,23 +509,38 @@ class DiagramCache:
         key = self._get_cache_key(description, diagram_type, rag_context, **kwargs)
         cache_path = self._get_cache_path(key)
         
-        if not cache_path.exists():
+        # A buffered entry may have been evicted from memory before its write
+        entry = self._hot.get(key) or self._pending.get(key)
+        if entry is not None:
+            if entry.is_valid():
+                return entry
+            self._hot.delete(key)
+            self._pending.pop(key, None)
+            _remove_file(cache_path)
+            return None
+        
+        # Open directly instead of checking existence first: one syscall fewer
+        try:
+            with open(cache_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
             return None
             
         try:
-            data = json.loads(cache_path.read_text())
+            data = from_json(raw)
             entry = CacheEntry.from_dict(data)
             
             if entry.is_valid():
+                self._hot.set(key, entry)
                 return entry
                 
             # Invalid entry, clean up
-            cache_path.unlink(missing_ok=True)
+            _remove_file(cache_path)
             return None
             
-        except (json.JSONDecodeError, KeyError):
+        except (ValueError, KeyError):
             # Invalid cache file, clean up
-            cache_path.unlink(missing_ok=True)
+            _remove_file(cache_path)
             return None
             
     def set(
@@ -173,16 +565,18 @@ class DiagramCache:
             **kwargs: Additional parameters affecting generation
         """
         key = self._get_cache_key(description, diagram_type, rag_context, **kwargs)
-        cache_path = self._get_cache_path(key)
         
         entry = CacheEntry(
             value=value,
             timestamp=time.time(),
             ttl=ttl,
-            metadata=metadata
+            metadata=metadata or {}
         )
         
-        cache_path.write_text(json.dumps(entry.to_dict(), indent=2))
+        self._hot.set(key, entry)
+        self._pending[key] = entry
+        if len(self._pending) >= self.flush_threshold:
+            self.flush()
         
     def invalidate(
         self,
@@ -204,12 +598,10 @@ class DiagramCache:
         """
         key = self._get_cache_key(description, diagram_type, rag_context, **kwargs)
         cache_path = self._get_cache_path(key)
+        self._hot.delete(key)
+        was_pending = self._pending.pop(key, None) is not None
         
-        if cache_path.exists():
-            cache_path.unlink()
-            return True
-            
-        return False
+        return _remove_file(cache_path) or was_pending
         
     def clear(self) -> int:
         """Clear all cached diagrams.
@@ -217,9 +609,22 @@ class DiagramCache:
         Returns:
             int: Number of cache entries removed
         """
-        count = 0
-        for cache_file in self.cache_dir.glob("*.json"):
-            cache_file.unlink()
-            count += 1
+        self._hot.clear()
+        removed = set(self._pending)
+        self._pending.clear()
+        # One directory pass covers cache files and leftovers from writes
+        # interrupted before their rename
+        with os.scandir(self._cache_dir_str) as entries:
+            for dir_entry in entries:
+                name = dir_entry.name
+                if name.endswith(".json"):
+                    if _remove_file(dir_entry.path):
+                        removed.add(name[:-5])
+                elif name.endswith(".json.tmp"):
+                    try:
+                        os.unlink(dir_entry.path)
+                    except OSError:
+                        # Gone already, or still open by a writer on Windows
+                        pass
             
-        return count
+        return len(removed)
@@ -1,7 +1,9 @@
 """Validator for diagram code."""
 
+import re
 from enum import Enum
-from typing import List, Dict, Optional, Set
+from functools import lru_cache
+from typing import List, Dict, Optional, Sequence, Set, Tuple
 
 class DiagramType(Enum):
     """High-level diagram syntax types."""
@@ -18,8 +20,14 @@ class DiagramType(Enum):
         Returns:
             DiagramType enum value or None if not found
         """
+        return cls._from_string_cached(value)
+
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _from_string_cached(value: str) -> Optional['DiagramType']:
+        """Memoized lookup behind from_string; the input space is tiny."""
         try:
-            return cls(value.lower())
+            return DiagramType(value.lower())
         except ValueError:
             return None
 
@@ -81,10 +89,10 @@ class DiagramSubType(Enum):
             if value.startswith('plantuml_'):
                 return cls(value)
             if value.startswith('mermaid_'):
-                # Try to match against enum values
-                for enum_item in cls:
-                    if enum_item.name.lower() == value.lower():
-                        return enum_item
+                # Match against member names, e.g. mermaid_sequence
+                member = _SUBTYPES_BY_NAME.get(value.lower())
+                if member is not None:
+                    return member
             return cls(value)
         except ValueError:
             return cls.AUTO
@@ -108,8 +116,14 @@ class DiagramSubType(Enum):
             ]
         return []
 
+# Lowercased member names for DiagramSubType.from_string; aliases such as
+# PLANTUML_MINDMAP are left out, as they are when iterating the enum
+_SUBTYPES_BY_NAME = {member.name.lower(): member for member in DiagramSubType}
+
 class ValidationResult:
     """Result of diagram validation."""
+    __slots__ = ("valid", "errors", "suggestions")
+
     def __init__(self, valid: bool, errors: List[str] = None, suggestions: List[str] = None):
         self.valid = valid
         self.errors = errors or []
@@ -123,6 +137,27 @@ class ValidationResult:
             "suggestions": self.suggestions
         }
 
+# Declarations a Mermaid diagram may start with
+_MERMAID_STARTERS = frozenset({
+    'graph', 'flowchart', 'sequenceDiagram', 'classDiagram',
+    'stateDiagram', 'erDiagram', 'gantt', 'pie', 'mindmap'
+})
+
+# Whitespace (other than the newline itself) at either end of a line
+_LINE_PADDING_RE = re.compile(r'^[^\S\n]+|[^\S\n]+$', re.MULTILINE)
+# A line holding only a PlantUML start/end tag, in any case
+_PLANTUML_TAG_RE = re.compile(r'^@(?:start|end)\S*$', re.IGNORECASE | re.MULTILINE)
+
+# Arrow tokens as alternations, longest first, so each line is searched once
+# rather than once per arrow variant
+_SEQUENCE_ARROW_RE = re.compile(r'-->>|->>|-->|->|-x')
+_ER_RELATION_RE = re.compile(r'--\|\{|--\|\||--o\|')
+# Declaration lines, found with one search over the whole code
+_CLASS_LINE_RE = re.compile(r'^[^\S\n]*class ', re.MULTILINE)
+_ENTITY_LINE_RE = re.compile(r'^[^\S\n]*entity ', re.MULTILINE)
+# Leading * run of each non-blank mindmap line; lines without one are level 0
+_MINDMAP_LEVEL_RE = re.compile(r'^(?=[^\n]*\S)[^\S\n]*(\**)', re.MULTILINE)
+
 class DiagramValidator:
     """Static validator for diagram code."""
 
@@ -137,8 +172,20 @@ class DiagramValidator:
         Returns:
             ValidationResult with validation status and any errors
         """
-        # Handle case-insensitive type matching
-        
+        valid, errors, suggestions = DiagramValidator._validate_cached(code, diagram_type)
+        # Fresh lists on every call, since callers may extend the errors
+        return ValidationResult(valid, list(errors), list(suggestions))
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _validate_cached(code: str, diagram_type: str) -> Tuple[bool, Tuple[str, ...], Tuple[str, ...]]:
+        """Memoized validation; the result depends only on the arguments."""
+        result = DiagramValidator._validate_uncached(code, diagram_type)
+        return result.valid, tuple(result.errors), tuple(result.suggestions)
+
+    @staticmethod
+    def _validate_uncached(code: str, diagram_type: str) -> ValidationResult:
+        """Validate diagram code for given type without the cache."""
         if not code or not code.strip():
             return ValidationResult(False, ["Empty diagram code"])
 
@@ -154,16 +201,43 @@ class DiagramValidator:
         else:
             diagram_type_enum = diagram_type
 
-        # Clean trailing semicolons and validate
-        if diagram_type_enum == DiagramType.MERMAID:
-            # Strip trailing semicolons
-            cleaned_code = DiagramValidator._clean_mermaid_code(code)
-            return DiagramValidator._validate_mermaid(cleaned_code)
-        elif diagram_type_enum == DiagramType.PLANTUML:
-            cleaned_code = DiagramValidator._clean_plantuml_code(code)
-            return DiagramValidator._validate_plantuml(cleaned_code)
-        else:
+        # Clean (e.g. strip trailing semicolons) and validate
+        pipeline = DiagramValidator._PIPELINES.get(diagram_type_enum)
+        if pipeline is None:
             return ValidationResult(False, [f"Unsupported diagram type: {diagram_type}"])
+        clean, check = pipeline
+        return check(clean(code))
+
+    @staticmethod
+    def validate_batch(codes: Sequence[str], diagram_type: str) -> List[ValidationResult]:
+        """Validate several diagrams of the same type.
+
+        The diagram type is resolved once for the whole batch instead of
+        once per diagram.
+
+        Args:
+            codes: Diagram codes to validate
+            diagram_type: Type shared by every diagram (e.g., 'mermaid', 'plantuml')
+
+        Returns:
+            ValidationResult for each code, in the same order
+        """
+        if isinstance(diagram_type, str):
+            diagram_type_enum = DiagramType.from_string(diagram_type.lower())
+        else:
+            diagram_type_enum = diagram_type
+
+        pipeline = DiagramValidator._PIPELINES.get(diagram_type_enum)
+        if pipeline is None:
+            # Let validate() build the usual type errors
+            return [DiagramValidator.validate(code, diagram_type) for code in codes]
+        clean, check = pipeline
+
+        return [
+            check(clean(code)) if code and code.strip()
+            else ValidationResult(False, ["Empty diagram code"])
+            for code in codes
+        ]
 
     @staticmethod
     def _clean_mermaid_code(code: str) -> str:
@@ -205,22 +279,21 @@ class DiagramValidator:
     def _validate_mermaid(code: str) -> ValidationResult:
         """Validate Mermaid diagram code."""
         code = code.strip()
-        valid_starters = {
-            'graph', 'flowchart', 'sequenceDiagram', 'classDiagram',
-            'stateDiagram', 'erDiagram', 'gantt', 'pie', 'mindmap'
-        }
-        
         first_word = code.split()[0].lower() if code else ''
         
-        if first_word not in valid_starters:
+        if first_word not in _MERMAID_STARTERS:
             return ValidationResult(
                 False,
                 ["Invalid or missing diagram type declaration"],
-                [f"Diagram must start with one of: {', '.join(valid_starters)}"]
+                [f"Diagram must start with one of: {', '.join(_MERMAID_STARTERS)}"]
             )
             
-        # Basic structure validation
-        if not any(line.strip() and not line.strip().startswith('%') for line in code.split('\n')[1:]):
+        # Split once; the type checks below share these lists
+        raw_lines = code.split('\n')
+        lines = [line for line in map(str.strip, raw_lines) if line and not line.startswith('%')]
+
+        # Basic structure validation; lines[0] is always the declaration
+        if len(lines) < 2:
             return ValidationResult(
                 False,
                 ["Diagram is empty or contains only comments"],
@@ -230,7 +303,6 @@ class DiagramValidator:
         # Type-specific validation
         if first_word == 'sequenceDiagram':
             # Validate participant declarations and message syntax
-            lines = [line.strip() for line in code.split('\n') if line.strip() and not line.strip().startswith('%')]
             if not any(line.startswith('participant ') or line.startswith('actor ') for line in lines):
                 return ValidationResult(
                     False,
@@ -249,16 +321,15 @@ class DiagramValidator:
 
             # Validate message syntax
             for line in message_lines:
-                if not (':' in line and any(x in line for x in ['->', '-->>', '->>', '-->', '-x'])):
+                if not (':' in line and _SEQUENCE_ARROW_RE.search(line)):
                     return ValidationResult(
                         False,
                         ["Invalid message syntax"],
                         ["Messages should follow format: ParticipantA->ParticipantB: Message"]
                     )
 
-        elif first_word in ['graph', 'flowchart']:
+        elif first_word in {'graph', 'flowchart'}:
             # Validate node and connection syntax
-            lines = [line.strip() for line in code.split('\n') if line.strip() and not line.strip().startswith('%')]
             nodes = set()
             connections = []
             
@@ -285,18 +356,8 @@ class DiagramValidator:
                 )
 
         elif first_word == 'classDiagram':
-            # Validate class declarations and relationships
-            lines = [line.strip() for line in code.split('\n') if line.strip() and not line.strip().startswith('%')]
-            classes = []
-            relationships = []
-            
-            for line in lines[1:]:
-                if line.startswith('class '):
-                    classes.append(line)
-                elif any(x in line for x in ['<|--', '*--', 'o--', '-->', '<--']):
-                    relationships.append(line)
-                
-            if not classes:
+            # Validate class declarations
+            if not _CLASS_LINE_RE.search(code):
                 return ValidationResult(
                     False,
                     ["No classes defined"],
@@ -305,7 +366,6 @@ class DiagramValidator:
 
         elif first_word == 'stateDiagram':
             # Validate state transitions
-            lines = [line.strip() for line in code.split('\n') if line.strip() and not line.strip().startswith('%')]
             states = set()
             transitions = []
             
@@ -325,7 +385,6 @@ class DiagramValidator:
 
         elif first_word == 'erDiagram':
             # Validate entity declarations and relationships
-            lines = [line.strip() for line in code.split('\n') if line.strip() and not line.strip().startswith('%')]
             entities = set()
             relationships = []
             
@@ -355,7 +414,6 @@ class DiagramValidator:
 
         elif first_word == 'gantt':
             # Validate gantt chart structure
-            lines = [line.strip() for line in code.split('\n') if line.strip() and not line.strip().startswith('%')]
             has_date_format = any('dateFormat' in line for line in lines)
             has_tasks = any(':' in line for line in lines[1:])  # Skip title line
             
@@ -375,7 +433,7 @@ class DiagramValidator:
 
         elif first_word == 'mindmap':
             # Mindmap validation (already implemented)
-            lines = [line for line in code.split('\n') if line.strip() and not line.strip().startswith('%')]
+            lines = [line for line in raw_lines if line.strip() and not line.strip().startswith('%')]
             if len(lines) < 2:
                 return ValidationResult(
                     False,
@@ -418,7 +476,7 @@ class DiagramValidator:
                 prev_indent = indent
 
         elif first_word == 'pie':
-            lines = code.split('\n')[1:]  # Skip the pie/title line
+            lines = raw_lines[1:]  # Skip the pie/title line
             for line in lines:
                 if line.strip() and not line.strip().startswith('%'):  # Skip empty lines and comments
                     # Check if the line has a value
@@ -435,7 +493,7 @@ class DiagramValidator:
                             )
 
         # Check for consistency in link styling
-        link_styles = [line for line in code.split('\n') if 'linkStyle' in line]
+        link_styles = [line for line in raw_lines if 'linkStyle' in line]
         if link_styles:
             numbered_styles = any('linkStyle 0 ' in style or 'linkStyle 1 ' in style for style in link_styles)
             if numbered_styles:
@@ -493,7 +551,7 @@ class DiagramValidator:
 
         if '@startmindmap' in start_line:
             # Validate mindmap structure
-            if not any('*' in line for line in content_lines):
+            if '*' not in content:
                 return ValidationResult(
                     False,
                     ["No mindmap nodes found"],
@@ -502,8 +560,8 @@ class DiagramValidator:
 
             # Check node hierarchy
             prev_level = 0
-            for line in content_lines:
-                level = len(line) - len(line.lstrip('*'))
+            for match in _MINDMAP_LEVEL_RE.finditer(content):
+                level = len(match.group(1))
                 if level > prev_level + 1:
                     return ValidationResult(
                         False,
@@ -514,23 +572,10 @@ class DiagramValidator:
 
         elif '@startuml' in start_line:
             # Look for diagram type indicators
-            if any(line.startswith('class ') for line in content_lines):
-                # Class diagram validation
-                classes = []
-                relationships = []
-                
-                for line in content_lines:
-                    if line.startswith('class '):
-                        classes.append(line)
-                    elif any(x in line for x in ['<|--', '*--', 'o--', '-->', '<--', '<|-', '-|>']):
-                        relationships.append(line)
-                
-                if not classes:
-                    return ValidationResult(
-                        False,
-                        ["No classes defined"],
-                        ["Define at least one class using 'class' keyword"]
-                    )
+            if _CLASS_LINE_RE.search(content):
+                # Class diagram; the class declaration just found is all
+                # that is required
+                pass
 
             elif '->' in content or '-->' in content:
                 # Sequence diagram validation
@@ -652,25 +697,14 @@ class DiagramValidator:
                         ["Define activities using :activity name; syntax"]
                     )
 
-            elif any(line.startswith('entity ') for line in content_lines):
-                # ER diagram validation
-                entities = set()
-                relationships = []
-                
-                for line in content_lines:
-                    if line.startswith('entity '):
-                        entities.add(line.split()[1])
-                    elif any(x in line for x in ['--|{', '--||', '--o|', '--||']):
-                        relationships.append(line)
-                
-                if not entities:
-                    return ValidationResult(
-                        False,
-                        ["No entities defined"],
-                        ["Define entities using 'entity' keyword"]
-                    )
-                
-                if not relationships:
+            elif _ENTITY_LINE_RE.search(content):
+                # ER diagram validation; entities are present, so check
+                # the relationships between them
+                if not any(
+                    _ER_RELATION_RE.search(line)
+                    for line in content_lines
+                    if not line.startswith('entity ')
+                ):
                     return ValidationResult(
                         False,
                         ["No relationships defined"],
@@ -707,20 +741,91 @@ class DiagramValidator:
     @staticmethod
     def _clean_plantuml_code(code: str) -> str:
         """Clean PlantUML diagram code by normalizing tags and whitespace."""
-        lines = code.strip().split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            # Strip whitespace
-            stripped = line.strip()
-            
-            # Fix common tag issues
-            if stripped.startswith('@start') and not ' ' in stripped:
-                # Fix missing space in tags like @startUML -> @startuml
-                stripped = stripped[:5].lower() + stripped[5:]
-            elif stripped.startswith('@end') and not ' ' in stripped:
-                stripped = stripped[:4].lower() + stripped[4:]
-                
-            cleaned_lines.append(stripped)
-            
-        return '\n'.join(cleaned_lines)
+        # Strip every line, then lowercase bare tags like @startUML -> @startuml
+        code = _LINE_PADDING_RE.sub('', code.strip())
+        return _PLANTUML_TAG_RE.sub(lambda match: match.group(0).lower(), code)
+
+# Cleaner and validator for each syntax, looked up by validate()
+DiagramValidator._PIPELINES = {
+    DiagramType.MERMAID: (DiagramValidator._clean_mermaid_code, DiagramValidator._validate_mermaid),
+    DiagramType.PLANTUML: (DiagramValidator._clean_plantuml_code, DiagramValidator._validate_plantuml),
+}
+
+def _next_mermaid_comment(code: str, start: int, stop: int) -> int:
+    """Find the next %% comment before stop, skipping %%{...}%% directives.
+
+    Args:
+        code: Code to search
+        start: Index to search from
+        stop: Index to search up to (end of the current line)
+
+    Returns:
+        Index of the comment marker, or -1
+    """
+    pos = code.find("%%", start, stop)
+    while pos >= 0:
+        if code[pos + 2:pos + 3] != "{" and (pos == 0 or code[pos - 1] != "}"):
+            return pos
+        pos = code.find("%%", pos + 1, stop)
+    return pos
+
+def strip_comments(code: str) -> str:
+    """Remove Mermaid and PlantUML comments from diagram code.
+
+    Handles PlantUML /' block '/ comments, Mermaid %% comments (but not
+    %%{...}%% directives) and PlantUML ' comments, which must start a line.
+    An unterminated /' is left as text. The code is walked once, with
+    str.find jumping between comment markers rather than stepping through
+    characters. Lines left empty are dropped and trailing whitespace is
+    trimmed; indentation of the remaining lines is kept.
+
+    Args:
+        code: Diagram code
+
+    Returns:
+        Code without comments
+    """
+    pieces = []
+    length = len(code)
+    # Position of the last '/ in the code; any /' at or after it is
+    # unterminated, so it never needs another forward search
+    last_close = code.rfind("'/")
+    pos = 0
+    while pos < length:
+        line_end = code.find("\n", pos)
+        if line_end < 0:
+            line_end = length
+
+        # Each pass of this loop starts at the beginning of a line
+        if code[pos:line_end].lstrip(" \t").startswith("'"):
+            pos = line_end
+        else:
+            search = pos
+            while True:
+                block = code.find("/'", search, line_end)
+                mermaid = _next_mermaid_comment(code, search, line_end)
+                if mermaid >= 0 and (block < 0 or mermaid < block):
+                    pieces.append(code[pos:mermaid])
+                    pos = line_end
+                    break
+                if block < 0:
+                    pieces.append(code[pos:line_end])
+                    pos = line_end
+                    break
+                close = code.find("'/", block + 2) if block + 2 <= last_close else -1
+                if close < 0:
+                    search = block + 1
+                    continue
+                # Block comments may end on a later line; carry on from there
+                pieces.append(code[pos:block])
+                pos = search = close + 2
+                line_end = code.find("\n", pos)
+                if line_end < 0:
+                    line_end = length
+
+        if pos < length:
+            pieces.append("\n")
+            pos += 1
+
+    code = "".join(pieces)
+    return "\n".join(line.rstrip() for line in code.split("\n") if line.strip())
@@ -2,17 +2,22 @@
 
 import os
 import re
+import hashlib
 import logging
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Tuple, Union
 import asyncio
 from pydantic import BaseModel, Field
 import json
+from collections import Counter
 
 # Import logging functions
 from diagram_generator.backend.api.logs import log_info, log_error, log_warning
 
 logger = logging.getLogger(__name__)
 
+# Documents sent per Ollama embedding request while loading a directory
+EMBED_BATCH_SIZE = 64
+
 class EmbeddingResult(BaseModel):
     """Model for embedding results."""
     embedding: List[float] = Field(..., description="Vector embedding")
@@ -68,8 +73,19 @@ class RAGStats(BaseModel):
 class RAGProvider:
     """Provider for Retrieval Augmented Generation."""
 
-    def __init__(self, config: Any, ollama_base_url: str = "http://localhost:11434"):
-        """Initialize RAG provider."""
+    def __init__(
+        self,
+        config: Any,
+        ollama_base_url: str = "http://localhost:11434",
+        cache_dir: str = os.path.expanduser("~/diagram_generator/rag_cache")
+    ):
+        """Initialize RAG provider.
+
+        Args:
+            config: RAG configuration
+            ollama_base_url: Ollama server URL
+            cache_dir: Directory for embedding manifests, one per documents directory
+        """
         self.config = config
         # Safe access to config attributes
         self.similarity_threshold = getattr(config, 'similarity_threshold', 0.2)
@@ -77,10 +93,25 @@ class RAGProvider:
         self.embedding_model = getattr(config, 'embedding_model', 'nomic-embed-text')
         
         self.ollama_base_url = ollama_base_url
+        self.cache_dir = cache_dir
+        # Unit-length document embeddings, one row per document; built on
+        # first search and dropped whenever the documents are replaced
+        self._embedding_matrix = None
         self.documents: List[EmbeddedDocument] = []
+        self.loaded_directory: Optional[str] = None
         self.stats = RAGStats()
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def documents(self) -> List[EmbeddedDocument]:
+        """Embedded documents searched by get_relevant_context."""
+        return self._documents
+
+    @documents.setter
+    def documents(self, documents: List[EmbeddedDocument]) -> None:
+        self._documents = documents
+        self._embedding_matrix = None
+
     def _is_code_file(self, filename: str) -> bool:
         """Check if a file is a code file based on extension."""
         code_extensions = {
@@ -101,53 +132,90 @@ class RAGProvider:
 
             log_info(f"Loading documents from {directory}")
             self.documents = []  # Reset documents
+            self.loaded_directory = None
             loaded_files = 0
             failed_files = 0
 
             # Simple file-based splitting approach - each file is one document
             if use_simple_file_splitting:
-                for root, _, files in os.walk(directory):
-                    for filename in files:
-                        if not self._is_code_file(filename):
-                            continue
-                            
-                        file_path = os.path.join(root, filename)
-                        rel_path = os.path.relpath(file_path, directory)
+                manifest_path = self._manifest_path(directory)
+                manifest = self._load_embedding_manifest(manifest_path)
+                pending: List[Document] = []
+                # (mtime_ns, size) of each pending file, and embeddings
+                # reused from the manifest by pending index
+                signatures: List[List[int]] = []
+                reused: Dict[int, List[float]] = {}
+                file_paths = [
+                    os.path.join(root, filename)
+                    for root, _, files in os.walk(directory)
+                    for filename in files
+                    if self._is_code_file(filename)
+                    and os.path.abspath(os.path.join(root, filename)) != manifest_path
+                ]
+                # Read the files concurrently in worker threads so the event
+                # loop is not blocked on each file in turn
+                reads = await asyncio.gather(
+                    *(asyncio.to_thread(self._read_doc_file, file_path) for file_path in file_paths),
+                    return_exceptions=True
+                )
+
+                for file_path, read in zip(file_paths, reads):
+                    if isinstance(read, Exception):
+                        failed_files += 1
+                        log_error(f"Error loading file {file_path}: {str(read)}")
+                        continue
+                    content, file_stat = read
+                        
+                    # Skip empty or very small files
+                    if len(content.strip()) < 5:
+                        continue
                         
-                        try:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                content = f.read()
-                                
-                            # Skip empty or very small files
-                            if len(content.strip()) < 5:
-                                continue
-                                
-                            # Create document metadata
-                            _, ext = os.path.splitext(filename)
-                            metadata = DocumentMetadata(
-                                source=rel_path,
-                                chunk_id=1,
-                                chunk_size=len(content),
-                                total_chunks=1,
-                                file_extension=ext
-                            )
-                            
-                            # Create document
-                            doc = Document(content=content, metadata=metadata)
-                            
-                            # Embed the document
-                            embedded_doc = await self._embed_document(doc)
-                            if embedded_doc:
-                                self.documents.append(embedded_doc)
-                                loaded_files += 1
-                                self.logger.debug(f"Loaded document from {rel_path}")
-                            else:
-                                failed_files += 1
-                                log_warning(f"Failed to embed document from {rel_path}")
-                                
-                        except Exception as e:
-                            failed_files += 1
-                            log_error(f"Error loading file {file_path}: {str(e)}")
+                    # Create document metadata
+                    rel_path = os.path.relpath(file_path, directory)
+                    _, ext = os.path.splitext(file_path)
+                    metadata = DocumentMetadata(
+                        source=rel_path,
+                        chunk_id=1,
+                        chunk_size=len(content),
+                        total_chunks=1,
+                        file_extension=ext
+                    )
+                    
+                    # Unchanged files keep their previous embedding
+                    signature = [file_stat.st_mtime_ns, file_stat.st_size]
+                    entry = manifest.get(rel_path)
+                    if entry and entry.get("signature") == signature and entry.get("embedding"):
+                        reused[len(pending)] = entry["embedding"]
+                    
+                    # Create document; embedding happens in batches below
+                    pending.append(Document(content=content, metadata=metadata))
+                    signatures.append(signature)
+
+                new_embeddings = iter(await self._embed_documents(
+                    [doc for i, doc in enumerate(pending) if i not in reused]
+                ))
+                entries = {}
+                for i, doc in enumerate(pending):
+                    if i in reused:
+                        embedded_doc = EmbeddedDocument(
+                            content=doc.content, metadata=doc.metadata, embedding=reused[i]
+                        )
+                    else:
+                        embedded_doc = next(new_embeddings)
+                    if embedded_doc:
+                        entries[doc.metadata.source] = {
+                            "signature": signatures[i],
+                            "embedding": embedded_doc.embedding
+                        }
+                        self.documents.append(embedded_doc)
+                        loaded_files += 1
+                        self.logger.debug(f"Loaded document from {doc.metadata.source}")
+                    else:
+                        failed_files += 1
+                        log_warning(f"Failed to embed document from {doc.metadata.source}")
+                if reused:
+                    log_info(f"Reused embeddings for {len(reused)} unchanged files")
+                self._save_embedding_manifest(manifest_path, entries)
             else:
                 # Original approach with complex chunking (not implemented here)
                 log_warning("Complex chunking not implemented, defaulting to file-based splitting")
@@ -157,6 +225,7 @@ class RAGProvider:
             self.stats.total_documents = len(self.documents)
             self.stats.loaded_files = loaded_files
             self.stats.failed_files = failed_files
+            self.loaded_directory = os.path.abspath(directory)
             
             log_info(f"Loaded {loaded_files} files with {len(self.documents)} documents. Failed: {failed_files}")
             return True
@@ -165,6 +234,128 @@ class RAGProvider:
             log_error(f"Error loading documents: {str(e)}", exc_info=True)
             return False
 
+    @staticmethod
+    def _read_doc_file(file_path: str) -> Tuple[str, os.stat_result]:
+        """Read a document file along with the stat taken when it was opened.
+
+        Args:
+            file_path: File to read
+
+        Returns:
+            Tuple of file content and stat result
+        """
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            file_stat = os.fstat(f.fileno())
+            return f.read(), file_stat
+
+    def _manifest_path(self, directory: str) -> str:
+        """Get the embedding manifest file for a documents directory.
+
+        Args:
+            directory: Documents directory
+
+        Returns:
+            Absolute manifest path under the cache directory
+        """
+        source = os.path.abspath(directory)
+        digest = hashlib.blake2b(source.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.abspath(os.path.join(self.cache_dir, f"{digest}.json"))
+
+    def _load_embedding_manifest(self, path: str) -> Dict[str, Dict[str, Any]]:
+        """Read embeddings saved by a previous load of a directory.
+
+        Args:
+            path: Manifest file
+
+        Returns:
+            Manifest entries by relative path; empty if there is no usable manifest
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            log_warning(f"Ignoring unreadable embedding manifest: {str(e)}")
+            return {}
+        # Embeddings from another model are not comparable
+        if not isinstance(manifest, dict) or manifest.get("model") != self.embedding_model:
+            return {}
+        return manifest.get("files") or {}
+
+    def _save_embedding_manifest(self, path: str, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Save embeddings so unchanged files are not re-embedded next time.
+
+        Args:
+            path: Manifest file
+            entries: Signature and embedding by relative path
+        """
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"model": self.embedding_model, "files": entries}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # An unwritable cache directory just means embedding again next load
+            log_warning(f"Could not save embedding manifest: {str(e)}")
+
+    async def _embed_documents(
+        self,
+        docs: List[Document],
+        batch_size: int = EMBED_BATCH_SIZE
+    ) -> List[Optional[EmbeddedDocument]]:
+        """Embed documents in batches using the Ollama /api/embed endpoint.
+
+        Each batch is one request over a shared session. A batch the
+        endpoint rejects (older Ollama versions lack it) is embedded one
+        document at a time instead.
+
+        Args:
+            docs: Documents to embed
+            batch_size: Maximum documents per request
+
+        Returns:
+            Embedded document, or None where embedding failed, for each input
+        """
+        if not docs:
+            return []
+
+        import aiohttp
+
+        results: List[Optional[EmbeddedDocument]] = []
+        url = f"{self.ollama_base_url}/api/embed"
+        async with aiohttp.ClientSession() as session:
+            for start in range(0, len(docs), batch_size):
+                batch = docs[start:start + batch_size]
+                payload = {
+                    "model": self.embedding_model,
+                    "input": [doc.content for doc in batch]
+                }
+                embeddings = None
+                try:
+                    async with session.post(url, json=payload) as response:
+                        response_json = await response.json()
+                        if response.status == 200:
+                            embeddings = response_json.get("embeddings")
+                            self.stats.embedding_requests += 1
+                        else:
+                            error = response_json.get("error", "Unknown error")
+                            log_warning(f"Batch embedding API error: {error}")
+                except Exception as e:
+                    log_warning(f"Batch embedding failed: {str(e)}")
+
+                if not embeddings or len(embeddings) != len(batch):
+                    results.extend([await self._embed_document(doc) for doc in batch])
+                    continue
+
+                for doc, embedding in zip(batch, embeddings):
+                    results.append(
+                        EmbeddedDocument(content=doc.content, metadata=doc.metadata, embedding=embedding)
+                        if embedding else None
+                    )
+        return results
+
     async def _embed_document(self, doc: Document) -> Optional[EmbeddedDocument]:
         """Embed a document using Ollama embedding API."""
         try:
@@ -173,7 +364,7 @@ class RAGProvider:
             # Prepare the request
             url = f"{self.ollama_base_url}/api/embeddings"
             payload = {
-                "model": "nomic-embed-text", # Good default embedding model
+                "model": self.embedding_model,
                 "prompt": doc.content
             }
             
@@ -220,25 +411,14 @@ class RAGProvider:
                 log_error("Failed to embed query")
                 return None
                 
-            # Calculate similarity with each document
-            results = []
-            for doc in self.documents:
-                similarity = self._calculate_similarity(query_embedding, doc.embedding)
-                # Use the instance variable instead of accessing config directly
-                if similarity > self.similarity_threshold:
-                    # Add score to the document for debugging
-                    doc_copy = EmbeddedDocument(
-                        content=doc.content,
-                        metadata=doc.metadata,
-                        embedding=doc.embedding,
-                        score=similarity
-                    )
-                    results.append((doc_copy, similarity))
-                    
-            # Sort by similarity and take top N
-            results.sort(key=lambda x: x[1], reverse=True)
-            # Use the instance variable
-            results = results[:self.max_documents]
+            import numpy as np
+
+            # Score every document at once, keep those above the threshold
+            # and take the top N, best first (ties keep document order)
+            scores = self._similarity_scores(query_embedding)
+            matches = np.flatnonzero(scores > self.similarity_threshold)
+            top = matches[np.argsort(-scores[matches], kind="stable")][:self.max_documents]
+            results = [(self.documents[i], float(scores[i])) for i in top]
             
             # Update stats
             self.stats.search_requests += 1
@@ -301,25 +481,36 @@ class RAGProvider:
             log_error(f"Error getting query embedding: {str(e)}", exc_info=True)
             return None
 
-    def _calculate_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        try:
-            import numpy as np
-            
-            # Convert to numpy arrays
-            vec1 = np.array(vec1)
-            vec2 = np.array(vec2)
-            
-            # Calculate cosine similarity
-            dot_product = np.dot(vec1, vec2)
-            norm_a = np.linalg.norm(vec1)
-            norm_b = np.linalg.norm(vec2)
-            
-            if norm_a == 0 or norm_b == 0:
-                return 0
-                
-            return dot_product / (norm_a * norm_b)
-            
-        except Exception as e:
-            log_error(f"Error calculating similarity: {str(e)}", exc_info=True)
-            return 0
+    def _similarity_scores(self, query_embedding: List[float]) -> Any:
+        """Calculate cosine similarity between a query and every document.
+
+        Documents whose embedding length differs from the rest score 0
+        rather than failing the search.
+
+        Args:
+            query_embedding: Query vector
+
+        Returns:
+            numpy array with one score per loaded document
+        """
+        import numpy as np
+
+        matrix = self._embedding_matrix
+        # Documents appended in place since the last build change the count
+        if matrix is None or len(matrix) != len(self.documents):
+            lengths = Counter(len(doc.embedding) for doc in self.documents)
+            dim = lengths.most_common(1)[0][0] if lengths else 0
+            if len(lengths) > 1:
+                log_warning(f"Ignoring {len(self.documents) - lengths[dim]} embeddings without {dim} dimensions")
+            rows = [doc.embedding if len(doc.embedding) == dim else [0.0] * dim for doc in self.documents]
+            matrix = np.asarray(rows, dtype=np.float32).reshape(len(rows), dim)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            # Zero vectors stay zero and so score 0
+            np.divide(matrix, norms, out=matrix, where=norms > 0)
+            self._embedding_matrix = matrix
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape != matrix.shape[1:]:
+            return np.zeros(len(self.documents), dtype=np.float32)
+        return matrix @ (query / norm)
@@ -2,6 +2,8 @@
 
 import asyncio
 import functools
+import inspect
+import time
 from typing import Any, Callable, Optional, Type, TypeVar
 
 T = TypeVar('T')
@@ -16,7 +18,8 @@ class RetryConfig:
         max_delay: float = 10.0,
         exponential_backoff: bool = True,
         exceptions: tuple[Type[Exception], ...] = (Exception,),
-        jitter: float = 0.0
+        jitter: float = 0.0,
+        backoff_factor: float = 2.0
     ):
         """Initialize retry configuration.
         
@@ -26,6 +29,10 @@ class RetryConfig:
             max_delay: Maximum delay between retries in seconds
             exponential_backoff: Whether to use exponential backoff
             exceptions: Tuple of exceptions to retry on
+            jitter: Maximum random offset in seconds added to or
+                subtracted from each delay
+            backoff_factor: Multiplier applied to the delay per attempt
+                when using exponential backoff
         """
         self.max_attempts = max_attempts
         self.base_delay = base_delay
@@ -33,6 +40,7 @@ class RetryConfig:
         self.exponential_backoff = exponential_backoff
         self.exceptions = exceptions
         self.jitter = jitter
+        self.backoff_factor = backoff_factor
         
     def get_delay(self, attempt: int) -> float:
         """Calculate delay for a given attempt number.
@@ -43,12 +51,12 @@ class RetryConfig:
         Returns:
             Delay in seconds
         """
-        # Calculate base delay
+        # Calculate base delay, capped whether or not it grows
         if not self.exponential_backoff:
             delay = self.base_delay
         else:
-            delay = self.base_delay * (2 ** (attempt - 1))
-            delay = min(delay, self.max_delay)
+            delay = self.base_delay * (self.backoff_factor ** (attempt - 1))
+        delay = min(delay, self.max_delay)
         
         # Add jitter if configured
         if self.jitter > 0:
@@ -83,13 +91,66 @@ def with_retries(config: RetryConfig = None) -> Callable:
                     
                     if attempt < config.max_attempts:
                         delay = config.get_delay(attempt)
-                        await asyncio.sleep(delay)
+                        if delay > 0:
+                            await asyncio.sleep(delay)
                     
             raise last_error or Exception("Maximum retry attempts exceeded")
             
         return wrapper
     return decorator
 
+def retry_async(
+    max_attempts: int = 3,
+    delay: float = 1.0,
+    exceptions: tuple[Type[Exception], ...] = (Exception,),
+    backoff: float = 1.0,
+    jitter: float = 0.0,
+    max_delay: Optional[float] = None
+) -> Callable:
+    """Decorator for retrying functions, async or sync.
+    
+    Coroutine functions are wrapped with ``with_retries`` and plain
+    functions with ``with_sync_retries``; the choice is made once at
+    decoration time.
+    
+    The wait before retry ``n`` is ``delay * backoff ** (n - 1)``, capped at
+    ``max_delay`` and offset by up to ``jitter`` seconds either way. With
+    the defaults every retry waits ``delay``. Starting small with a backoff
+    above 1 keeps quick recoveries fast, and jitter stops many callers
+    retrying in lockstep.
+    
+    Only exceptions matching ``exceptions`` are retried; anything else
+    propagates on the first attempt without sleeping. A delay of 0 retries
+    immediately without yielding to the event loop.
+    
+    Args:
+        max_attempts: Maximum number of attempts
+        delay: Delay before the first retry in seconds
+        exceptions: Tuple of exceptions to retry on
+        backoff: Multiplier applied to the delay after each retry
+        jitter: Maximum random offset in seconds applied to each delay
+        max_delay: Upper bound for a single delay (unbounded if None)
+        
+    Returns:
+        Decorated function
+    """
+    config = RetryConfig(
+        max_attempts=max_attempts,
+        base_delay=delay,
+        max_delay=max_delay if max_delay is not None else float("inf"),
+        exponential_backoff=backoff != 1.0,
+        exceptions=exceptions,
+        jitter=jitter,
+        backoff_factor=backoff
+    )
+    
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        if inspect.iscoroutinefunction(func):
+            return with_retries(config)(func)
+        return with_sync_retries(config)(func)
+        
+    return decorator
+
 def with_sync_retries(config: RetryConfig = None) -> Callable:
     """Decorator for retrying synchronous functions on failure.
     
@@ -114,8 +175,10 @@ def with_sync_retries(config: RetryConfig = None) -> Callable:
                     last_error = e
                     
                     if attempt < config.max_attempts:
-                        from time import sleep
-                        sleep(config.get_delay(attempt))
+                        delay = config.get_delay(attempt)
+                        if delay > 0:
+                            from time import sleep
+                            sleep(delay)
                     
             raise last_error or Exception("Maximum retry attempts exceeded")
             
@@ -129,7 +192,8 @@ class CircuitBreaker:
         self,
         failure_threshold: int = 5,
         reset_timeout: float = 60.0,
-        half_open_timeout: float = 30.0
+        half_open_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
     ):
         """Initialize circuit breaker.
         
@@ -137,6 +201,8 @@ class CircuitBreaker:
             failure_threshold: Number of failures before opening circuit
             reset_timeout: Time in seconds before resetting failure count
             half_open_timeout: Time in seconds before allowing a test request
+            clock: Monotonic time source in seconds (the event loop's
+                default); tests pass a manual clock to move time
         """
         self.failure_threshold = failure_threshold
         self.reset_timeout = reset_timeout
@@ -145,10 +211,11 @@ class CircuitBreaker:
         self.failures = 0
         self.last_failure_time = 0
         self.state = "CLOSED"
+        self._clock = clock
         
     def record_failure(self) -> None:
         """Record a failure and potentially open the circuit."""
-        current_time = asyncio.get_event_loop().time()
+        current_time = self._clock()
         
         # Reset failure count if enough time has passed
         if current_time - self.last_failure_time > self.reset_timeout:
@@ -174,7 +241,7 @@ class CircuitBreaker:
         if self.state == "CLOSED":
             return True
             
-        current_time = asyncio.get_event_loop().time()
+        current_time = self._clock()
         if current_time - self.last_failure_time > self.half_open_timeout:
             self.state = "HALF_OPEN"
             return True
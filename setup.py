@@ -31,8 +31,9 @@ setup(
     extras_require={
         "dev": [
             "pytest>=7.4.3",
-            "pytest-asyncio>=0.23.0",
+            "pytest-asyncio>=0.26.0",
             "pytest-cov>=4.1.0",
+            "pytest-xdist>=3.5.0",
         ]
     },
     entry_points={
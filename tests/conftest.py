@@ -1,5 +1,6 @@
 """Global test configuration and fixtures."""
 
+import os
 import pytest
 from pathlib import Path
 from diagram_generator.backend.models.configs import (
@@ -10,25 +11,52 @@ from diagram_generator.backend.models.configs import (
     CircuitBreakerSettings
 )
 
+# Syntax markers used on validator cases (see pytest.ini)
+_SYNTAX_MARKERS = frozenset({"mermaid", "plantuml"})
+
+def pytest_collection_modifyitems(config, items):
+    """Deselect the other syntax's cases when DIAGRAM_FOCUS is set.
+
+    ``DIAGRAM_FOCUS=mermaid pytest`` drops every test marked ``plantuml``
+    and the reverse; tests without a syntax marker always run.
+    """
+    others = _SYNTAX_MARKERS - {os.environ.get("DIAGRAM_FOCUS", "").lower()}
+    if len(others) != 1:
+        return
+    (other,) = others
+    selected, deselected = [], []
+    for item in items:
+        (deselected if item.get_closest_marker(other) else selected).append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
 @pytest.fixture
 def agent_config():
-    """Basic agent configuration with default model."""
-    return AgentConfig(
+    """Basic agent configuration with default model.
+
+    The values are known to be valid, so validation is skipped with
+    ``model_construct``.
+
+    Function-scoped because DiagramGenerator updates ``options.agent`` in
+    place; module-scoped fixtures build their own config instead.
+    """
+    return AgentConfig.model_construct(
         enabled=True,
         model_name="llama3.1:8b",
         temperature=0.2,
         max_iterations=3,
         system_prompt=None,
-        retry=RetrySettings(),
-        circuit_breaker=CircuitBreakerSettings()
+        retry=RetrySettings.model_construct(),
+        circuit_breaker=CircuitBreakerSettings.model_construct()
     )
 
 @pytest.fixture
 def generation_options(agent_config):
     """Generation options with default settings."""
-    return DiagramGenerationOptions(
+    return DiagramGenerationOptions.model_construct(
         agent=agent_config,
-        rag=DiagramRAGConfig(
+        rag=DiagramRAGConfig.model_construct(
             enabled=False,
             api_doc_dir="",
             similarity_threshold=0.7
@@ -40,11 +68,14 @@ def test_description():
     """Sample diagram description for tests."""
     return "Create a sequence diagram showing user login flow"
 
-@pytest.fixture
-def test_code_dir(tmp_path):
-    """Create a temporary directory with sample code files."""
-    dir_path = tmp_path / "test_code"
-    dir_path.mkdir()
+@pytest.fixture(scope="session")
+def test_code_dir(tmp_path_factory):
+    """Create a temporary directory with sample code files.
+
+    The files are static and only read by consumers, so the directory is
+    written once per session and shared.
+    """
+    dir_path = tmp_path_factory.mktemp("test_code")
     
     # Create a sample Python file
     sample_py = dir_path / "sample.py"
@@ -0,0 +1,67 @@
+"""Shared fixtures for integration tests."""
+
+import pytest
+from diagram_generator.backend.agents.diagram_agent import DiagramAgent
+from diagram_generator.backend.models.configs import DiagramRAGConfig
+from diagram_generator.backend.storage.database import Storage, StorageConfig
+from diagram_generator.backend.utils.rag import RAGProvider
+
+class _NullLLM:
+    """Stand-in Ollama client that fails if a request is ever made."""
+
+    base_url = "http://localhost:11434"
+
+    async def generate(self, *args, **kwargs):
+        raise AssertionError("validation_only_agent must not call the LLM")
+
+    async def close(self) -> None:
+        pass
+
+@pytest.fixture(scope="session")
+def validation_only_agent(tmp_path_factory):
+    """Agent for tests that only exercise input validation.
+
+    Built normally over a temporary storage directory, with its Ollama
+    client replaced so any attempt to reach the LLM fails the test. The
+    real client opens no connection until first used.
+    """
+    storage = Storage(StorageConfig(data_dir=str(tmp_path_factory.mktemp("validation_storage"))))
+    agent = DiagramAgent(default_model="llama3.1:8b", storage=storage)
+    agent.ollama = _NullLLM()
+    return agent
+
+@pytest.fixture(scope="session")
+async def agent():
+    """Diagram agent shared by all integration tests.
+
+    The agent holds no per-run state, so a single instance is reused for
+    the whole session instead of being rebuilt in every test, and its
+    pooled connections to Ollama stay warm between tests.
+
+    The test model is loaded with one minimal generate request before the
+    agent is handed out, so the cold-start cost is paid here rather than
+    inside whichever test happens to run first. Tests that only need
+    validation_only_agent never reach Ollama.
+    """
+    agent = DiagramAgent(default_model="llama3.1:8b")
+    # OllamaAPI returns failures rather than raising them, so an unreachable
+    # server surfaces in the tests themselves
+    await agent.ollama.generate(prompt="Reply with OK.", model=agent.default_model)
+    yield agent
+    await agent.aclose()
+
+@pytest.fixture(scope="session")
+async def rag_provider(agent, test_code_dir, tmp_path_factory):
+    """RAG provider with ``test_code_dir`` loaded and embedded once per session.
+
+    Pass it to ``generate_diagram`` together with a RAG config pointing at
+    ``test_code_dir`` and the agent reuses its documents instead of
+    embedding the sample files again.
+    """
+    provider = RAGProvider(
+        config=DiagramRAGConfig(enabled=True, api_doc_dir=str(test_code_dir)),
+        ollama_base_url=agent.ollama.base_url,
+        cache_dir=str(tmp_path_factory.mktemp("rag_cache"))
+    )
+    await provider.load_docs_from_directory(str(test_code_dir), use_simple_file_splitting=True)
+    return provider
@@ -0,0 +1,56 @@
+"""Assertion helpers shared by the integration tests."""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Pattern, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z_][a-z0-9_]*")
+
+@lru_cache(maxsize=None)
+def _compile_needles(needles: FrozenSet[str]) -> Tuple[Pattern, Dict[str, FrozenSet[str]]]:
+    """Build a single-pass matcher for a set of lowercase needles.
+
+    The pattern is a zero-width lookahead over the needles, longest first,
+    so one ``finditer`` call reports the longest needle starting at every
+    position. Any shorter needle starting at the same position is a prefix
+    of that match, which is why each match maps to every needle it contains.
+    """
+    alternation = "|".join(re.escape(needle) for needle in sorted(needles, key=len, reverse=True))
+    pattern = re.compile(f"(?=({alternation}))")
+    implied = {needle: frozenset(other for other in needles if other in needle) for needle in needles}
+    return pattern, implied
+
+def present_in(code: str, needles: Iterable[str], ignore_case: bool = True) -> Set[str]:
+    """Return the needles that occur in ``code``.
+
+    ``code`` is scanned once, however many needles are checked. When
+    ignoring case it is lowercased once up front and needles must be given
+    in lowercase.
+
+    Args:
+        code: Diagram code to search
+        needles: Substrings to look for
+        ignore_case: Whether to match case-insensitively
+
+    Returns:
+        The subset of ``needles`` found in ``code``
+    """
+    pattern, implied = _compile_needles(frozenset(needles))
+    found: Set[str] = set()
+    for match in pattern.finditer(code.lower() if ignore_case else code):
+        found |= implied[match.group(1)]
+    return found
+
+def token_set(code: str) -> Set[str]:
+    """Return the lowercase identifier tokens in ``code``.
+
+    Intersect the result with a set of keywords to check for whole words,
+    so that e.g. ``"node"`` does not match inside ``"nodes"``.
+
+    Args:
+        code: Diagram code to tokenize
+
+    Returns:
+        Set of identifier-like tokens
+    """
+    return set(_TOKEN_RE.findall(code.lower()))
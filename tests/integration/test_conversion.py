@@ -1,21 +1,80 @@
 """Integration tests for diagram type and format conversions."""
 
+import asyncio
+
 import pytest
-from diagram_generator.backend.agents.diagram_agent import DiagramAgent
-from diagram_generator.backend.models.configs import DiagramGenerationOptions
+from diagram_generator.backend.models.configs import (
+    AgentConfig,
+    DiagramGenerationOptions,
+    DiagramRAGConfig
+)
 
-pytestmark = pytest.mark.asyncio
+from .helpers import token_set
 
-async def test_mermaid_to_plantuml(agent_config):
-    """Test converting Mermaid to PlantUML."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Generate initial Mermaid diagram
-    initial_result = await agent.generate_diagram(
-        description="Create a sequence diagram showing login flow",
-        diagram_type="mermaid",
-        options=DiagramGenerationOptions(agent=agent_config)
+pytestmark = pytest.mark.xdist_group(name="test_conversion")
+
+def _rag_options(agent_config, test_code_dir):
+    """Generation options with RAG over the sample code directory."""
+    return DiagramGenerationOptions(
+        agent=agent_config,
+        rag=DiagramRAGConfig(
+            enabled=True,
+            api_doc_dir=str(test_code_dir),
+            similarity_threshold=0.7
+        )
+    )
+
+@pytest.fixture(scope="module")
+async def pregenerated_diagrams(agent, test_code_dir, rag_provider):
+    """Source diagrams for the conversion tests, generated concurrently.
+
+    None of the conversion tests depend on each other's source diagram, so
+    every initial generation is issued in a single gather up front. The
+    function-scoped agent_config is not available here, so the fixture
+    builds its own.
+    """
+    agent_config = AgentConfig(
+        enabled=True,
+        model_name=agent.default_model,
+        temperature=0.2,
+        max_iterations=3
     )
+    options = DiagramGenerationOptions(agent=agent_config)
+    requests = {
+        "login_mermaid": agent.generate_diagram(
+            description="Create a sequence diagram showing login flow",
+            diagram_type="mermaid",
+            options=options
+        ),
+        "user_management_plantuml": agent.generate_diagram(
+            description="Create a class diagram showing basic user management",
+            diagram_type="plantuml",
+            options=options
+        ),
+        "authentication_mermaid": agent.generate_diagram(
+            description="Create a sequence diagram for user authentication",
+            diagram_type="mermaid",
+            options=options
+        ),
+        "registration_mermaid": agent.generate_diagram(
+            description="""Create a flowchart showing a complex user registration process 
+        with email verification, input validation, and error handling""",
+            diagram_type="mermaid",
+            options=options
+        ),
+        "auth_system_rag_mermaid": agent.generate_diagram(
+            description="Create a class diagram for the authentication system",
+            diagram_type="mermaid",
+            options=_rag_options(agent_config, test_code_dir),
+            rag_provider=rag_provider
+        ),
+    }
+    results = await asyncio.gather(*requests.values())
+    return dict(zip(requests, results))
+
+async def test_mermaid_to_plantuml(agent, agent_config, pregenerated_diagrams):
+    """Test converting Mermaid to PlantUML."""
+    initial_result = pregenerated_diagrams["login_mermaid"]
     
     # Verify initial diagram
     assert initial_result.code is not None
@@ -38,16 +97,9 @@ async def test_mermaid_to_plantuml(agent_config):
     assert "participant" in lower_code
     assert "->" in lower_code
 
-async def test_plantuml_to_mermaid(agent_config):
+async def test_plantuml_to_mermaid(agent, agent_config, pregenerated_diagrams):
     """Test converting PlantUML to Mermaid."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Generate initial PlantUML diagram
-    initial_result = await agent.generate_diagram(
-        description="Create a class diagram showing basic user management",
-        diagram_type="plantuml",
-        options=DiagramGenerationOptions(agent=agent_config)
-    )
+    initial_result = pregenerated_diagrams["user_management_plantuml"]
     
     # Verify initial diagram
     assert initial_result.code is not None
@@ -68,16 +120,9 @@ async def test_plantuml_to_mermaid(agent_config):
     assert "@startuml" not in converted_result.code
     assert "@enduml" not in converted_result.code
 
-async def test_diagram_type_conversion(agent_config):
+async def test_diagram_type_conversion(agent, agent_config, pregenerated_diagrams):
     """Test converting between diagram types within same syntax."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Generate sequence diagram
-    sequence_result = await agent.generate_diagram(
-        description="Create a sequence diagram for user authentication",
-        diagram_type="mermaid",
-        options=DiagramGenerationOptions(agent=agent_config)
-    )
+    sequence_result = pregenerated_diagrams["authentication_mermaid"]
     
     # Convert to class diagram
     converted_result = await agent.convert_diagram(
@@ -92,20 +137,11 @@ async def test_diagram_type_conversion(agent_config):
     assert "class" in converted_result.code.lower()
     
     # Should contain similar entities
-    assert any(word in converted_result.code.lower() 
-              for word in ["user", "auth", "authenticate"])
+    assert token_set(converted_result.code) & {"user", "auth", "authenticate"}
 
-async def test_complex_diagram_conversion(agent_config):
+async def test_complex_diagram_conversion(agent, agent_config, pregenerated_diagrams):
     """Test converting complex diagrams with nested elements."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Generate complex Mermaid flowchart
-    initial_result = await agent.generate_diagram(
-        description="""Create a flowchart showing a complex user registration process 
-        with email verification, input validation, and error handling""",
-        diagram_type="mermaid",
-        options=DiagramGenerationOptions(agent=agent_config)
-    )
+    initial_result = pregenerated_diagrams["registration_mermaid"]
     
     # Convert to PlantUML
     converted_result = await agent.convert_diagram(
@@ -125,33 +161,16 @@ async def test_complex_diagram_conversion(agent_config):
     assert "valid" in lower_code
     assert "error" in lower_code
 
-async def test_conversion_with_rag(agent_config, test_code_dir):
+async def test_conversion_with_rag(agent, agent_config, test_code_dir, pregenerated_diagrams):
     """Test conversion with RAG context."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Configure RAG
-    options = DiagramGenerationOptions(
-        agent=agent_config,
-        rag=RAGConfig(
-            enabled=True,
-            api_doc_dir=str(test_code_dir),
-            similarity_threshold=0.7
-        )
-    )
-    
-    # Generate initial Mermaid class diagram
-    initial_result = await agent.generate_diagram(
-        description="Create a class diagram for the authentication system",
-        diagram_type="mermaid",
-        options=options
-    )
+    initial_result = pregenerated_diagrams["auth_system_rag_mermaid"]
     
     # Convert to PlantUML
     converted_result = await agent.convert_diagram(
         code=initial_result.code,
         source_type="mermaid",
         target_type="plantuml",
-        options=options
+        options=_rag_options(agent_config, test_code_dir)
     )
     
     # Verify code entities are preserved
@@ -159,46 +178,49 @@ async def test_conversion_with_rag(agent_config, test_code_dir):
     assert "AuthService" in converted_result.code
     assert "validateUser" in converted_result.code.lower()
 
-async def test_conversion_error_handling(agent_config):
+async def test_conversion_error_handling(agent, agent_config):
     """Test error handling in conversion process."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
+    options = DiagramGenerationOptions(agent=agent_config)
     
-    # Test with empty code
-    with pytest.raises(ValueError):
-        await agent.convert_diagram(
+    # Run the independent cases concurrently and check each outcome
+    empty_code, invalid_source, invalid_target, result = await asyncio.gather(
+        # Empty code
+        agent.convert_diagram(
             code="",
             source_type="mermaid",
             target_type="plantuml",
-            options=DiagramGenerationOptions(agent=agent_config)
-        )
-    
-    # Test with invalid source type
-    with pytest.raises(ValueError):
-        await agent.convert_diagram(
+            options=options
+        ),
+        # Invalid source type
+        agent.convert_diagram(
             code="some diagram code",
             source_type="invalid",
             target_type="plantuml",
-            options=DiagramGenerationOptions(agent=agent_config)
-        )
-    
-    # Test with invalid target type
-    with pytest.raises(ValueError):
-        await agent.convert_diagram(
+            options=options
+        ),
+        # Invalid target type
+        agent.convert_diagram(
             code="some diagram code",
             source_type="mermaid",
             target_type="invalid",
-            options=DiagramGenerationOptions(agent=agent_config)
-        )
-    
-    # Test with malformed diagram code
-    result = await agent.convert_diagram(
-        code="malformed diagram code",
-        source_type="mermaid",
-        target_type="plantuml",
-        options=DiagramGenerationOptions(agent=agent_config)
+            options=options
+        ),
+        # Malformed diagram code
+        agent.convert_diagram(
+            code="malformed diagram code",
+            source_type="mermaid",
+            target_type="plantuml",
+            options=options
+        ),
+        return_exceptions=True
     )
     
-    # Should still produce valid PlantUML
+    assert isinstance(empty_code, ValueError)
+    assert isinstance(invalid_source, ValueError)
+    assert isinstance(invalid_target, ValueError)
+    
+    # Malformed code should still produce valid PlantUML
+    assert not isinstance(result, BaseException), f"Conversion raised {result!r}"
     assert result.code is not None
     assert "@startuml" in result.code
     assert "@enduml" in result.code
@@ -2,19 +2,23 @@
 
 import pytest
 from pathlib import Path
-from diagram_generator.backend.agents.diagram_agent import DiagramAgent
 from diagram_generator.backend.models.configs import (
     DiagramGenerationOptions,
     DiagramRAGConfig
 )
 from diagram_generator.backend.utils.rag import RAGProvider
 
-pytestmark = pytest.mark.asyncio
+from .helpers import present_in, token_set
 
-async def test_rag_with_python_code(agent_config, test_code_dir):
+pytestmark = pytest.mark.xdist_group(name="test_rag")
+
+_USER_CLASS_ENTITIES = frozenset({"class user", "username", "login"})
+_VALIDATE_USER_SPELLINGS = frozenset({"validateuser", "validate_user", "validate user"})
+_SEQUENCE_DECLARATIONS = frozenset({"sequencediagram", "graph td"})
+_STRUCTURE_WORDS = frozenset({"component", "service", "class"})
+
+async def test_rag_with_python_code(agent, agent_config, test_code_dir, rag_provider):
     """Test RAG with Python source code."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
     # Configure RAG
     rag_config = DiagramRAGConfig(
         enabled=True,
@@ -30,7 +34,8 @@ async def test_rag_with_python_code(agent_config, test_code_dir):
     result = await agent.generate_diagram(
         description="Create a class diagram showing the User class implementation",
         diagram_type="mermaid",
-        options=options
+        options=options,
+        rag_provider=rag_provider
     )
     
     # Basic validity checks
@@ -38,19 +43,15 @@ async def test_rag_with_python_code(agent_config, test_code_dir):
     assert len(result.code) > 0
     
     # Should detect and include User class from test files
-    code_lower = result.code.lower()
-    assert "class user" in code_lower
-    assert "username" in code_lower
-    assert "login" in code_lower
+    present = present_in(result.code, _USER_CLASS_ENTITIES)
+    assert present == _USER_CLASS_ENTITIES, f"Missing: {_USER_CLASS_ENTITIES - present}"
     
     # Verify RAG was used
     assert result.notes is not None
     assert any("context" in note.lower() for note in result.notes)
 
-async def test_rag_with_typescript_code(agent_config, test_code_dir):
+async def test_rag_with_typescript_code(agent, agent_config, test_code_dir, rag_provider):
     """Test RAG with TypeScript source code."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
     rag_config = DiagramRAGConfig(
         enabled=True,
         api_doc_dir=str(test_code_dir),
@@ -65,7 +66,8 @@ async def test_rag_with_typescript_code(agent_config, test_code_dir):
     result = await agent.generate_diagram(
         description="Create a sequence diagram showing the authentication flow",
         diagram_type="mermaid",
-        options=options
+        options=options,
+        rag_provider=rag_provider
     )
     
     # Basic validity checks
@@ -73,18 +75,19 @@ async def test_rag_with_typescript_code(agent_config, test_code_dir):
     assert len(result.code) > 0
     
     # Should include AuthService from test files
-    code_lower = result.code.lower()
-    assert "authservice" in code_lower
-    assert any(method in code_lower for method in ["validateuser", "validate_user", "validate user"])
+    present = present_in(
+        result.code,
+        {"authservice", "->"} | _VALIDATE_USER_SPELLINGS | _SEQUENCE_DECLARATIONS
+    )
+    assert "authservice" in present
+    assert present & _VALIDATE_USER_SPELLINGS
     
-    # Sequence diagram elements
-    assert any(decl in code_lower for decl in ["sequencediagram", "graph td"])
-    assert "->" in code_lower or "->>" in code_lower
+    # Sequence diagram elements ("->" also covers "->>")
+    assert present & _SEQUENCE_DECLARATIONS
+    assert "->" in present
 
-async def test_rag_combined_sources(agent_config, test_code_dir):
+async def test_rag_combined_sources(agent, agent_config, test_code_dir, rag_provider):
     """Test RAG with multiple file types."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
     rag_config = DiagramRAGConfig(
         enabled=True,
         api_doc_dir=str(test_code_dir),
@@ -99,7 +102,8 @@ async def test_rag_combined_sources(agent_config, test_code_dir):
     result = await agent.generate_diagram(
         description="Create a component diagram showing the entire authentication system",
         diagram_type="mermaid",
-        options=options
+        options=options,
+        rag_provider=rag_provider
     )
     
     # Basic validity checks
@@ -107,15 +111,13 @@ async def test_rag_combined_sources(agent_config, test_code_dir):
     assert len(result.code) > 0
     
     # Should include components from both files
-    code_lower = result.code.lower()
-    assert "user" in code_lower
-    assert "auth" in code_lower
-    assert any(word in code_lower for word in ["component", "service", "class"])
+    present = present_in(result.code, {"user", "auth"})
+    assert "user" in present
+    assert "auth" in present
+    assert token_set(result.code) & _STRUCTURE_WORDS
 
-async def test_rag_with_empty_directory(agent_config, tmp_path):
+async def test_rag_with_empty_directory(agent, agent_config, tmp_path):
     """Test RAG behavior with empty directory."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
     empty_dir = tmp_path / "empty"
     empty_dir.mkdir()
     
@@ -139,15 +141,13 @@ async def test_rag_with_empty_directory(agent_config, tmp_path):
     
     assert result.code is not None
     assert len(result.code) > 0
-    code_lower = result.code.lower()
+    present = present_in(result.code, _SEQUENCE_DECLARATIONS | {"->"})
     # Accept either sequence diagram or graph declarations
-    assert any(decl in code_lower for decl in ["sequencediagram", "graph td"])
-    assert "->" in code_lower or "->>" in code_lower
+    assert present & _SEQUENCE_DECLARATIONS
+    assert "->" in present  # Also covers "->>"
 
-async def test_rag_with_invalid_files(agent_config, tmp_path):
+async def test_rag_with_invalid_files(agent, agent_config, tmp_path):
     """Test RAG handling of invalid file types."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
     # Create test files
     test_dir = tmp_path / "test_files"
     test_dir.mkdir()
@@ -180,9 +180,8 @@ async def test_rag_with_invalid_files(agent_config, tmp_path):
     code_lower = result.code.lower()
     assert "class" in code_lower
 
-async def test_rag_similarity_threshold(agent_config, test_code_dir):
+async def test_rag_similarity_threshold(agent, agent_config, test_code_dir, rag_provider):
     """Test different similarity thresholds."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
     description = "Create a class diagram for the authentication system"
     
     # Test with high threshold
@@ -198,7 +197,8 @@ async def test_rag_similarity_threshold(agent_config, test_code_dir):
         options=DiagramGenerationOptions(
             agent=agent_config,
             rag=high_threshold_config
-        )
+        ),
+        rag_provider=rag_provider
     )
     
     # Test with low threshold
@@ -214,7 +214,8 @@ async def test_rag_similarity_threshold(agent_config, test_code_dir):
         options=DiagramGenerationOptions(
             agent=agent_config,
             rag=low_threshold_config
-        )
+        ),
+        rag_provider=rag_provider
     )
     
     # Both should produce valid diagrams
@@ -1,29 +1,56 @@
 """Integration tests for diagram generation and updates."""
 
+import asyncio
+import re
+
 import pytest
-from diagram_generator.backend.agents.diagram_agent import DiagramAgent
 from diagram_generator.backend.models.configs import (
+    AgentConfig,
     DiagramGenerationOptions
 )
 
-pytestmark = pytest.mark.asyncio
+from .helpers import present_in
 
-async def test_diagram_update_adding_departments(agent_config):
-    """Test updating a diagram by adding a department."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Generate initial VFX department flowchart
-    initial_result = await agent.generate_diagram(
-        description="Create a flowchart showing VFX department workflow with modeling, animation, and rendering departments",
+pytestmark = pytest.mark.xdist_group(name="test_refinement")
+
+_RENDERING_ORDER_RE = re.compile(r"rendering|compositing")
+_MODELING_ORDER_RE = re.compile(r"modeling|animation")
+
+_CORE_DEPTS = frozenset({"modeling", "animation", "rendering"})
+_ALL_DEPTS = frozenset({"concept", "modeling", "rigging", "animation", "lighting", "rendering"})
+
+# Lowercase syntax markers an update must keep for each diagram type
+_PRESERVED_SYNTAX = {
+    "mermaid": ("graph", "-->"),
+    "plantuml": ("@startuml", "@enduml"),
+}
+
+def _first_seen(pattern, code):
+    """List pattern matches in order of appearance, scanning code once."""
+    return [match.group() for match in pattern.finditer(code)]
+
+@pytest.fixture(scope="module")
+async def vfx_initial(agent):
+    """Six-department VFX workflow shared by the add/remove update tests."""
+    agent_config = AgentConfig(
+        enabled=True,
+        model_name=agent.default_model,
+        temperature=0.2,
+        max_iterations=3
+    )
+    return await agent.generate_diagram(
+        description="Create a VFX workflow with concept, modeling, rigging, animation, lighting, and rendering departments",
         diagram_type="mermaid",
         options=DiagramGenerationOptions(agent=agent_config)
     )
+
+async def test_diagram_update_adding_departments(agent, agent_config, vfx_initial):
+    """Test updating a diagram by adding a department."""
+    initial_result = vfx_initial
     
     # Verify initial diagram has core departments
     assert initial_result.code is not None
-    initial_code_lower = initial_result.code.lower()
-    for dept in ["modeling", "animation", "rendering"]:
-        assert dept in initial_code_lower
+    assert present_in(initial_result.code, _CORE_DEPTS) == _CORE_DEPTS
     
     # Update diagram to add compositing department
     update_result = await agent.update_diagram(
@@ -36,43 +63,34 @@ async def test_diagram_update_adding_departments(agent_config):
     # Verify updates
     assert update_result.code is not None
     update_code_lower = update_result.code.lower()
+    present = present_in(
+        update_code_lower, _CORE_DEPTS | {"compositing", "graph", "-->"}, ignore_case=False
+    )
     
     # Check original departments still exist
-    for dept in ["modeling", "animation", "rendering"]:
-        assert dept in update_code_lower
+    assert _CORE_DEPTS <= present
         
     # Check new department was added
-    assert "compositing" in update_code_lower
+    assert "compositing" in present
     
     # Basic structural checks
-    assert "graph" in update_code_lower
-    assert "-->" in update_result.code  # Verify flow connections
+    assert "graph" in present
+    assert "-->" in present  # Verify flow connections
     
     # Verify its not just a completely new diagram (should maintain similar structure)
     assert len(update_result.code) > len(initial_result.code)
     
     # Basic check that compositing is connected after rendering
-    rendered_first = update_code_lower.find("rendering")
-    compositing_pos = update_code_lower.find("compositing") 
-    assert rendered_first < compositing_pos
+    order = _first_seen(_RENDERING_ORDER_RE, update_code_lower)
+    assert order.index("rendering") < order.index("compositing")
 
-async def test_diagram_update_removing_departments(agent_config):
+async def test_diagram_update_removing_departments(agent, agent_config, vfx_initial):
     """Test updating a diagram by removing a department."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Generate initial diagram with multiple departments
-    initial_result = await agent.generate_diagram(
-        description="Create a VFX workflow with concept, modeling, rigging, animation, lighting, and rendering departments",
-        diagram_type="mermaid",
-        options=DiagramGenerationOptions(agent=agent_config)
-    )
+    initial_result = vfx_initial
     
     # Verify initial diagram has all departments
     assert initial_result.code is not None
-    initial_code_lower = initial_result.code.lower()
-    initial_depts = ["concept", "modeling", "rigging", "animation", "lighting", "rendering"]
-    for dept in initial_depts:
-        assert dept in initial_code_lower
+    assert present_in(initial_result.code, _ALL_DEPTS) == _ALL_DEPTS
         
     # Remove rigging department
     update_result = await agent.update_diagram(
@@ -85,34 +103,26 @@ async def test_diagram_update_removing_departments(agent_config):
     # Verify updates
     assert update_result.code is not None
     update_code_lower = update_result.code.lower()
+    present = present_in(update_code_lower, _ALL_DEPTS | {"graph", "-->"}, ignore_case=False)
     
     # Check rigging was removed
-    assert "rigging" not in update_code_lower
+    assert "rigging" not in present
     
     # Check other departments still exist
-    remaining_depts = ["concept", "modeling", "animation", "lighting", "rendering"]
-    for dept in remaining_depts:
-        assert dept in update_code_lower
+    assert _ALL_DEPTS - {"rigging"} <= present
     
     # Verify structure maintained
-    assert "graph" in update_code_lower
-    assert "-->" in update_result.code
+    assert "graph" in present
+    assert "-->" in present
     
     # Basic check that modeling and animation are still in correct order
-    modeling_pos = update_code_lower.find("modeling")
-    animation_pos = update_code_lower.find("animation")
-    assert modeling_pos < animation_pos
+    order = _first_seen(_MODELING_ORDER_RE, update_code_lower)
+    assert order.index("modeling") < order.index("animation")
 
-async def test_diagram_update_error_handling(agent_config):
+async def test_diagram_update_error_handling(validation_only_agent, agent_config):
     """Test error handling in diagram update process."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
-    
-    # Generate a diagram to test with
-    initial_result = await agent.generate_diagram(
-        description="Create a simple VFX workflow",
-        diagram_type="mermaid",
-        options=DiagramGenerationOptions(agent=agent_config)
-    )
+    agent = validation_only_agent
+    diagram_code = "graph TD\n    A[Modeling] --> B[Rendering]"
     
     # Try updating with empty code
     with pytest.raises(ValueError):
@@ -126,7 +136,7 @@ async def test_diagram_update_error_handling(agent_config):
     # Try empty update notes
     with pytest.raises(ValueError):
         await agent.update_diagram(
-            diagram_code=initial_result.code,
+            diagram_code=diagram_code,
             update_notes="",
             diagram_type="mermaid",
             options=DiagramGenerationOptions(agent=agent_config)
@@ -135,39 +145,39 @@ async def test_diagram_update_error_handling(agent_config):
     # Try invalid diagram type
     with pytest.raises(ValueError):
         await agent.update_diagram(
-            diagram_code=initial_result.code,
+            diagram_code=diagram_code,
             update_notes="Add a department",
             diagram_type="invalid_type",
             options=DiagramGenerationOptions(agent=agent_config)
         )
 
-async def test_diagram_type_preservation(agent_config):
+async def test_diagram_type_preservation(agent, agent_config):
     """Test that diagram type is preserved during updates."""
-    agent = DiagramAgent(default_model="llama3.1:8b")
+    diagram_types = list(_PRESERVED_SYNTAX)
     
-    diagram_types = ["mermaid", "plantuml"]
-    
-    for diagram_type in diagram_types:
-        # Generate initial diagram
-        initial_result = await agent.generate_diagram(
+    # Generate the initial diagrams concurrently
+    initial_results = await asyncio.gather(*(
+        agent.generate_diagram(
             description=f"Create a VFX workflow diagram in {diagram_type}",
             diagram_type=diagram_type,
             options=DiagramGenerationOptions(agent=agent_config)
         )
-        
-        # Update it
-        update_result = await agent.update_diagram(
+        for diagram_type in diagram_types
+    ))
+    
+    # Update them concurrently
+    update_results = await asyncio.gather(*(
+        agent.update_diagram(
             diagram_code=initial_result.code,
             update_notes="Add effects department",
             diagram_type=diagram_type,
             options=DiagramGenerationOptions(agent=agent_config)
         )
-        
+        for diagram_type, initial_result in zip(diagram_types, initial_results)
+    ))
+    
+    for diagram_type, update_result in zip(diagram_types, update_results):
         # Check type-specific syntax is preserved
-        code_lower = update_result.code.lower()
-        if diagram_type == "plantuml":
-            assert "@startuml" in code_lower
-            assert "@enduml" in code_lower
-        else:  # mermaid
-            assert "graph" in code_lower
-            assert "-->" in update_result.code
+        markers = set(_PRESERVED_SYNTAX[diagram_type])
+        missing = markers - present_in(update_result.code, markers)
+        assert not missing, f"{diagram_type} update lost {sorted(missing)}"
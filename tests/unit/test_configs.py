@@ -1,6 +1,7 @@
 """Unit tests for configuration models."""
 
 import pytest
+from pydantic import ValidationError
 from diagram_generator.backend.models.configs import (
     AgentConfig,
     DiagramGenerationOptions,
@@ -9,6 +10,47 @@ from diagram_generator.backend.models.configs import (
     CircuitBreakerSettings
 )
 
+# One row per rejected value: (model class, constructor kwargs, failing field,
+# expected message). Each row is collected as its own test so a single case
+# can be selected with -k.
+INVALID_CONFIG_CASES = [
+    pytest.param(AgentConfig, {"temperature": 2.0}, "temperature",
+                 "temperature must be between 0 and 1", id="agent-temperature-too-high"),
+    pytest.param(AgentConfig, {"max_iterations": 0}, "max_iterations",
+                 "max_iterations must be at least 1", id="agent-max-iterations-zero"),
+    pytest.param(DiagramRAGConfig, {"chunk_size": 1000, "chunk_overlap": 1000}, "chunk_overlap",
+                 "chunk_overlap must be smaller than chunk_size", id="rag-overlap-not-smaller"),
+    pytest.param(DiagramRAGConfig, {"top_k_results": 0}, "top_k_results",
+                 "Value must be positive", id="rag-top-k-zero"),
+    pytest.param(RetrySettings, {"max_attempts": 0}, "max_attempts",
+                 "max_attempts must be positive", id="retry-max-attempts-zero"),
+    pytest.param(RetrySettings, {"base_delay": -1.0}, "base_delay",
+                 "base_delay must be positive", id="retry-base-delay-negative"),
+    pytest.param(RetrySettings, {"max_delay": 0.0}, "max_delay",
+                 "max_delay must be positive", id="retry-max-delay-zero"),
+    pytest.param(RetrySettings, {"jitter": -0.1}, "jitter",
+                 "jitter must be positive", id="retry-jitter-negative"),
+    pytest.param(CircuitBreakerSettings, {"failure_threshold": 0}, "failure_threshold",
+                 "failure_threshold must be at least 1", id="breaker-threshold-zero"),
+    pytest.param(CircuitBreakerSettings, {"reset_timeout": -1.0}, "reset_timeout",
+                 "Timeouts must be positive", id="breaker-reset-timeout-negative"),
+    pytest.param(CircuitBreakerSettings, {"half_open_timeout": 0.0}, "half_open_timeout",
+                 "Timeouts must be positive", id="breaker-half-open-timeout-zero"),
+]
+
+def _assert_validation_error(fn, field, message):
+    """Assert fn raises a ValidationError for field with message.
+
+    Reads the structured errors() list instead of regex-matching the
+    rendered exception text.
+    """
+    with pytest.raises(ValidationError) as exc_info:
+        fn()
+    assert any(
+        field in error["loc"] and message in error["msg"]
+        for error in exc_info.value.errors()
+    ), exc_info.value.errors()
+
 def test_agent_config_validation():
     """Test agent configuration validation."""
     # Valid config
@@ -21,24 +63,6 @@ def test_agent_config_validation():
     assert config.model_name == "llama3.1:8b"
     assert config.temperature == 0.2
     
-    # Invalid temperature
-    with pytest.raises(ValueError):
-        AgentConfig(
-            enabled=True,
-            model_name="llama3.1:8b",
-            temperature=2.0,  # Too high
-            max_iterations=3
-        )
-    
-    # Invalid max_iterations
-    with pytest.raises(ValueError):
-        AgentConfig(
-            enabled=True,
-            model_name="llama3.1:8b",
-            temperature=0.2,
-            max_iterations=0  # Must be > 0
-        )
-    
     # Empty model name is allowed (will use default)
     config = AgentConfig(
         enabled=True,
@@ -67,23 +91,6 @@ def test_rag_config_validation():
     )
     assert config.chunk_size == 1000
     assert config.chunk_overlap == 200
-    
-    # Invalid chunk overlap
-    with pytest.raises(ValueError):
-        DiagramRAGConfig(
-            enabled=True,
-            api_doc_dir="/path/to/docs",
-            chunk_size=1000,
-            chunk_overlap=1000  # Must be less than chunk_size
-        )
-    
-    # Invalid top_k_results
-    with pytest.raises(ValueError):
-        DiagramRAGConfig(
-            enabled=True,
-            api_doc_dir="/path/to/docs",
-            top_k_results=0  # Must be positive
-        )
 
 def test_retry_settings():
     """Test retry settings validation."""
@@ -97,21 +104,6 @@ def test_retry_settings():
     )
     assert settings.max_attempts == 3
     assert settings.base_delay == 1.0
-    
-    # Invalid max_attempts
-    with pytest.raises(ValueError):
-        RetrySettings(max_attempts=0)
-    
-    # Invalid delays
-    with pytest.raises(ValueError):
-        RetrySettings(base_delay=-1.0)
-    
-    with pytest.raises(ValueError):
-        RetrySettings(max_delay=0.0)
-    
-    # Invalid jitter
-    with pytest.raises(ValueError):
-        RetrySettings(jitter=-0.1)
 
 def test_circuit_breaker_settings():
     """Test circuit breaker settings validation."""
@@ -124,17 +116,11 @@ def test_circuit_breaker_settings():
     )
     assert settings.failure_threshold == 5
     assert settings.reset_timeout == 60.0
-    
-    # Invalid failure threshold
-    with pytest.raises(ValueError):
-        CircuitBreakerSettings(failure_threshold=0)
-    
-    # Invalid timeouts
-    with pytest.raises(ValueError):
-        CircuitBreakerSettings(reset_timeout=-1.0)
-    
-    with pytest.raises(ValueError):
-        CircuitBreakerSettings(half_open_timeout=0.0)
+
+@pytest.mark.parametrize("model_cls,kwargs,field,message", INVALID_CONFIG_CASES)
+def test_invalid_config_values(model_cls, kwargs, field, message):
+    """Test that each config model rejects out-of-range values."""
+    _assert_validation_error(lambda: model_cls(**kwargs), field, message)
 
 def test_generation_options():
     """Test generation options composition."""
@@ -171,29 +157,29 @@ def test_generation_options():
 
 def test_config_defaults():
     """Test configuration default values."""
-    # Test RetrySettings defaults
-    retry = RetrySettings()
-    assert retry.max_attempts == 3
-    assert retry.base_delay == 1.0
-    assert retry.max_delay == 10.0
-    assert retry.exponential_backoff is True
-    assert retry.jitter == 0.1
+    # Test RetrySettings defaults (read from the field table, no instance needed)
+    retry = RetrySettings.model_fields
+    assert retry["max_attempts"].default == 3
+    assert retry["base_delay"].default == 1.0
+    assert retry["max_delay"].default == 10.0
+    assert retry["exponential_backoff"].default is True
+    assert retry["jitter"].default == 0.1
     
     # Test CircuitBreakerSettings defaults
-    cb = CircuitBreakerSettings()
-    assert cb.enabled is True
-    assert cb.failure_threshold == 5
-    assert cb.reset_timeout == 60.0
-    assert cb.half_open_timeout == 30.0
+    cb = CircuitBreakerSettings.model_fields
+    assert cb["enabled"].default is True
+    assert cb["failure_threshold"].default == 5
+    assert cb["reset_timeout"].default == 60.0
+    assert cb["half_open_timeout"].default == 30.0
     
     # Test DiagramRAGConfig defaults
-    rag = DiagramRAGConfig()
-    assert rag.enabled is False
-    assert rag.embedding_model == "nomic-embed-text"
-    assert rag.max_documents == 5
-    assert rag.similarity_threshold == 0.2
-    assert rag.chunk_size == 1000
-    assert rag.chunk_overlap == 200
+    rag = DiagramRAGConfig.model_fields
+    assert rag["enabled"].default is False
+    assert rag["embedding_model"].default == "nomic-embed-text"
+    assert rag["max_documents"].default == 5
+    assert rag["similarity_threshold"].default == 0.2
+    assert rag["chunk_size"].default == 1000
+    assert rag["chunk_overlap"].default == 200
 
 def test_config_copy():
     """Test configuration copying."""
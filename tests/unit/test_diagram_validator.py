@@ -4,143 +4,36 @@ import pytest
 from diagram_generator.backend.utils.diagram_validator import (
     DiagramValidator, 
     DiagramType,
+    DiagramSubType,
     ValidationResult
 )
 
-def test_diagram_type_enum():
-    """Test diagram type enumeration."""
-    # Valid types
-    assert DiagramType.from_string("mermaid") == DiagramType.MERMAID
-    assert DiagramType.from_string("plantuml") == DiagramType.PLANTUML
-    
-    # Case insensitive
-    assert DiagramType.from_string("MERMAID") == DiagramType.MERMAID
-    assert DiagramType.from_string("Plantuml") == DiagramType.PLANTUML
-    
-    # Invalid types
-    assert DiagramType.from_string("invalid") is None
-    assert DiagramType.from_string("") is None
-
-def test_mermaid_sequence_validation():
-    """Test Mermaid sequence diagram validation."""
-    validator = DiagramValidator()
-    
-    # Valid sequence diagram
-    valid_code = """graph TD
-sequenceDiagram
-participant User
-participant System
-User->>System: Login request
-System-->>User: Success response"""
-    result = validator.validate(valid_code, DiagramType.MERMAID)
-    assert result.valid, f"Validation failed with errors: {result.errors}"
-    assert not result.errors
-    
-    # Missing participant
-    invalid_code = """sequenceDiagram
-A->>B: Message"""
-    result = validator.validate(invalid_code, DiagramType.MERMAID)
-    assert not result.valid
-    assert result.errors
-    assert any(error.lower().count("diagram") > 0 for error in result.errors)
-
-def test_mermaid_flowchart_validation():
-    """Test Mermaid flowchart validation."""
-    validator = DiagramValidator()
-    
-    # Valid flowchart
-    valid_code = """graph TD
-A[Start] --> B{Decision}
-B -->|Yes| C[Action]
-B -->|No| D[End]"""
-    result = validator.validate(valid_code, DiagramType.MERMAID)
-    assert result.valid
-    assert not result.errors
-    
-    # Empty flowchart
-    empty_code = "flowchart TD"
-    result = validator.validate(empty_code, DiagramType.MERMAID)
-    assert not result.valid
-    assert result.errors
-
-def test_plantuml_validation():
-    """Test PlantUML validation."""
-    validator = DiagramValidator()
-    
-    # Valid sequence diagram
-    valid_code = """@startuml
-participant "API" as api
-participant "Database" as db
-api -> db : Read data
-db --> api : Data response
-@enduml"""
-    result = validator.validate(valid_code, DiagramType.PLANTUML)
-    assert result.valid, f"Validation failed with errors: {result.errors}"
-    assert not result.errors
-    
-    # Missing end tag
-    invalid_code = """@startuml
-participant "Component A"
-"""
-    result = validator.validate(invalid_code, DiagramType.PLANTUML)
-    assert not result.valid
-    assert any("enduml" in error.lower() for error in result.errors)
-
-def test_empty_validation():
-    """Test validation of empty or whitespace input."""
-    validator = DiagramValidator()
-    
-    # Empty string
-    result = validator.validate("", DiagramType.MERMAID)
-    assert not result.valid
-    assert result.errors
-    assert any("empty" in error.lower() for error in result.errors)
-    
-    # Only whitespace
-    result = validator.validate("   \n\t   ", DiagramType.MERMAID)
-    assert not result.valid
-    assert result.errors
-    assert any("empty" in error.lower() for error in result.errors)
-
-def test_invalid_type_validation():
-    """Test validation with invalid diagram type."""
-    validator = DiagramValidator()
-    
-    code = """graph TD\nA->B: Message"""
-    result = validator.validate(code, "invalid_type")
-    assert not result.valid
-    assert any("type" in error.lower() for error in result.errors)
-
-def test_plantuml_start_tags():
-    """Test PlantUML start tag validation."""
-    validator = DiagramValidator()
-    
-    # Test different start tags
-    start_tags = {
-        'mindmap': """@startmindmap
+# PlantUML samples for each supported start tag
+PLANTUML_START_CASES = [
+    pytest.param("""@startmindmap
 * root
 ** First
 ** Second
-@enduml""",
-        'gantt': """@startgantt
+@enduml""", id='mindmap'),
+    pytest.param("""@startgantt
 project starts 2024-01-01
 [Task1] lasts 10 days
 then [Task2] lasts 4 days
-@enduml""",
-        'class': """@startuml
+@enduml""", id='gantt'),
+    pytest.param("""@startuml
 class User {
   +name: String
   +login(): void
 }
 class Admin extends User
-@enduml""",
-        'sequence': """@startuml
+@enduml""", id='class'),
+    pytest.param("""@startuml
 participant "Alice" as A
 participant "Bob" as B
 A -> B : Request
 B --> A : Response
-@enduml""",
-        'component': """@startuml
+@enduml""", id='sequence'),
+    pytest.param("""@startuml
 actor User
 participant "Web UI" as ui
 participant "API" as api
@@ -148,47 +41,129 @@ User -> ui : Login
 ui -> api : Authenticate
 api --> ui : Success
 ui --> User : Welcome
-@enduml"""
-    }
-    
-    for diagram_type, code in start_tags.items():
-        result = validator.validate(code, DiagramType.PLANTUML)
-        assert result.valid, f"Failed for {diagram_type} diagram: {result.errors}"
+@enduml""", id='component'),
+]
 
-def test_mermaid_comments():
-    """Test Mermaid comment handling."""
-    validator = DiagramValidator()
-    
-    code_with_comments = """graph TD
+# Syntax markers for -m selection, plus matching xdist groups so that
+# "-n auto --dist=loadgroup" keeps each syntax on one worker
+MERMAID_MARKS = (pytest.mark.mermaid, pytest.mark.xdist_group("mermaid"))
+PLANTUML_MARKS = (pytest.mark.plantuml, pytest.mark.xdist_group("plantuml"))
+
+# (diagram_type, code, expected_error): expected_error is None for valid
+# diagrams, otherwise a substring expected in one of the lowercased errors.
+VALIDATION_CASES = [
+    pytest.param(DiagramType.MERMAID, """graph TD
+sequenceDiagram
+participant User
+participant System
+User->>System: Login request
+System-->>User: Success response""", None, id='mermaid-sequence', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, """sequenceDiagram
+A->>B: Message""", "diagram", id='mermaid-sequence-missing-participant', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, """graph TD
+A[Start] --> B{Decision}
+B -->|Yes| C[Action]
+B -->|No| D[End]""", None, id='mermaid-flowchart', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, "flowchart TD", "empty", id='mermaid-flowchart-empty', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, """graph TD
 %% Actor definitions
 A[Start] -->|Action| B[End]
-%% Flow complete"""
-    
-    result = validator.validate(code_with_comments, DiagramType.MERMAID)
-    assert result.valid, f"Validation failed with errors: {result.errors}"
-    assert not result.errors
-
-def test_whitespace_handling():
-    """Test handling of different whitespace patterns."""
-    validator = DiagramValidator()
-    
-    code_with_spaces = """graph TD
+%% Flow complete""", None, id='mermaid-comments', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, """graph TD
 A[Start] --> B{Process}
     B -->|Yes| C[Success]
-        B -->|No| D[Failure]"""
-    result = validator.validate(code_with_spaces, DiagramType.MERMAID)
-    assert result.valid, f"Validation failed with errors: {result.errors}"
-    assert not result.errors
-
-def test_multiline_validation():
-    """Test validation across multiple lines."""
-    validator = DiagramValidator()
-    
-    valid_code = """graph TD
+        B -->|No| D[Failure]""", None, id='mermaid-whitespace', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, """graph TD
 A[Start] --> B{Process}
 B -->|Yes| C[Continue]
 B -->|No| D[Stop]
-C --> E[Complete]"""
-    result = validator.validate(valid_code, DiagramType.MERMAID)
-    assert result.valid, f"Validation failed with errors: {result.errors}"
-    assert not result.errors
+C --> E[Complete]""", None, id='mermaid-multiline', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, "", "empty", id='empty-string', marks=MERMAID_MARKS),
+    pytest.param(DiagramType.MERMAID, "   \n\t   ", "empty", id='whitespace-only', marks=MERMAID_MARKS),
+    pytest.param("invalid_type", "graph TD\nA->B: Message", "type", id='invalid-type'),
+    pytest.param(DiagramType.PLANTUML, """@startuml
+participant "API" as api
+participant "Database" as db
+api -> db : Read data
+db --> api : Data response
+@enduml""", None, id='plantuml-sequence', marks=PLANTUML_MARKS),
+    pytest.param(DiagramType.PLANTUML, """@startuml
+participant "Component A"
+""", "enduml", id='plantuml-missing-end', marks=PLANTUML_MARKS),
+    pytest.param(DiagramType.PLANTUML, """@startUML
+  participant "API" as api
+  api -> api : Ping
+@ENDUML""", None, id='plantuml-tag-case', marks=PLANTUML_MARKS),
+    pytest.param(DiagramType.PLANTUML, """@startmindmap
+* root
+*** Skipped a level
+@enduml""", "hierarchy", id='plantuml-mindmap-skipped-level', marks=PLANTUML_MARKS),
+    pytest.param(DiagramType.PLANTUML, """@startuml
+entity Customer
+entity Order
+@enduml""", "relationships", id='plantuml-er-no-relationships', marks=PLANTUML_MARKS),
+    pytest.param(DiagramType.PLANTUML, """@startuml
+entity Customer
+entity Order
+Customer --o| Order
+@enduml""", None, id='plantuml-er', marks=PLANTUML_MARKS),
+] + [
+    pytest.param(DiagramType.PLANTUML, case.values[0], None, id=f'plantuml-{case.id}', marks=PLANTUML_MARKS)
+    for case in PLANTUML_START_CASES
+]
+
+@pytest.fixture(scope="module")
+def validator():
+    """Shared validator; validate() keeps no state between calls."""
+    return DiagramValidator()
+
+def test_diagram_type_enum():
+    """Test diagram type enumeration."""
+    # Valid types
+    assert DiagramType.from_string("mermaid") == DiagramType.MERMAID
+    assert DiagramType.from_string("plantuml") == DiagramType.PLANTUML
+    
+    # Case insensitive
+    assert DiagramType.from_string("MERMAID") == DiagramType.MERMAID
+    assert DiagramType.from_string("Plantuml") == DiagramType.PLANTUML
+    
+    # Invalid types
+    assert DiagramType.from_string("invalid") is None
+    assert DiagramType.from_string("") is None
+
+def test_diagram_subtype_from_string():
+    """Test diagram subtype lookup by value and by prefixed name."""
+    assert DiagramSubType.from_string("sequenceDiagram") == DiagramSubType.MERMAID_SEQUENCE
+    assert DiagramSubType.from_string("class") == DiagramSubType.PLANTUML_CLASS
+    assert DiagramSubType.from_string("mermaid_sequence") == DiagramSubType.MERMAID_SEQUENCE
+    assert DiagramSubType.from_string("mermaid_MINDMAP") == DiagramSubType.MERMAID_MINDMAP
+    assert DiagramSubType.from_string("mermaid_unknown") == DiagramSubType.AUTO
+    assert DiagramSubType.from_string("auto") == DiagramSubType.AUTO
+
+@pytest.mark.parametrize("diagram_type,code,expected_error", VALIDATION_CASES)
+def test_validation(validator, diagram_type, code, expected_error):
+    """Test Mermaid and PlantUML validation results."""
+    result = validator.validate(code, diagram_type)
+    if expected_error is None:
+        assert result.valid, f"Validation failed with errors: {result.errors}"
+        assert not result.errors
+    else:
+        assert not result.valid
+        assert any(expected_error in error.lower() for error in result.errors)
+
+def test_validate_returns_independent_results(validator):
+    """Test repeated validations do not share mutable error lists."""
+    first = validator.validate("flowchart TD", DiagramType.MERMAID)
+    first.errors.append("added by caller")
+    second = validator.validate("flowchart TD", DiagramType.MERMAID)
+    assert second.errors == ["Diagram is empty or contains only comments"]
+
+@pytest.mark.parametrize("diagram_type", [DiagramType.MERMAID, DiagramType.PLANTUML, "invalid_type"])
+def test_validate_batch(validator, diagram_type):
+    """Test batch validation matches validating each diagram alone."""
+    codes = [case.values[1] for case in VALIDATION_CASES]
+    results = validator.validate_batch(codes, diagram_type)
+    assert len(results) == len(codes)
+    for code, result in zip(codes, results):
+        expected = validator.validate(code, diagram_type)
+        assert result.to_dict() == expected.to_dict()
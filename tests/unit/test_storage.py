@@ -0,0 +1,75 @@
+"""Unit tests for the file-based storage layer."""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from diagram_generator.backend.storage.database import (
+    DiagramRecord,
+    Storage,
+    StorageConfig
+)
+
+@pytest.fixture
+def storage(tmp_path):
+    """Storage over an empty temporary data directory."""
+    return Storage(StorageConfig(data_dir=str(tmp_path)))
+
+@pytest.fixture
+def index_writes(storage, monkeypatch):
+    """Record the index contents each time storage writes its index file."""
+    writes = []
+    write_text = Path.write_text
+
+    def recording_write_text(path, data, *args, **kwargs):
+        if path == storage.index_path:
+            writes.append(json.loads(data))
+        return write_text(path, data, *args, **kwargs)
+    monkeypatch.setattr(Path, "write_text", recording_write_text)
+    return writes
+
+def _diagram(diagram_id):
+    """Minimal diagram record."""
+    return DiagramRecord(
+        id=diagram_id,
+        description="Login flow",
+        diagram_type="mermaid",
+        code="sequenceDiagram\nA->>B: Login",
+        created_at=datetime(2024, 1, 1)
+    )
+
+def test_bulk_writes_saves_index_once(storage, index_writes):
+    """Test saves inside bulk_writes write the index once, on exit."""
+    with storage.bulk_writes():
+        for i in range(3):
+            storage.save_diagram(_diagram(f"d{i}"))
+        assert index_writes == []
+        assert len(list(storage.diagrams_path.glob("*.json"))) == 3
+
+    assert len(index_writes) == 1
+    assert sorted(index_writes[0]["diagrams"]) == ["d0", "d1", "d2"]
+
+def test_bulk_writes_nested(storage, index_writes):
+    """Test nested bulk_writes blocks flush only when the outermost exits."""
+    with storage.bulk_writes():
+        with storage.bulk_writes():
+            storage.save_diagram(_diagram("inner"))
+        assert index_writes == []
+        storage.save_diagram(_diagram("outer"))
+
+    assert len(index_writes) == 1
+    assert sorted(index_writes[0]["diagrams"]) == ["inner", "outer"]
+
+def test_bulk_writes_saves_index_after_error(storage, index_writes):
+    """Test the index is still written when the block raises."""
+    with pytest.raises(RuntimeError):
+        with storage.bulk_writes():
+            storage.save_diagram(_diagram("saved"))
+            raise RuntimeError("interrupted")
+
+    assert len(index_writes) == 1
+    assert list(index_writes[0]["diagrams"]) == ["saved"]
+    # Later saves write the index immediately again
+    storage.save_diagram(_diagram("after"))
+    assert len(index_writes) == 2
@@ -1,12 +1,82 @@
 """Unit tests for utility functions."""
 
+import asyncio
 import pytest
 import time
 from pathlib import Path
+from types import SimpleNamespace
 import json
-from diagram_generator.backend.utils.caching import Cache
-from diagram_generator.backend.utils.retry import retry_async
+import os
+import shutil
+import threading
+from urllib.parse import urlparse
+import aiohttp
+from diagram_generator.backend.utils.caching import Cache, DiagramCache
+from diagram_generator.backend.utils.retry import CircuitBreaker, RetryConfig, retry_async
 from diagram_generator.backend.utils.diagram_validator import strip_comments
+from diagram_generator.backend.utils.rag import (
+    Document,
+    DocumentMetadata,
+    EmbeddedDocument,
+    RAGConfig,
+    RAGProvider
+)
+
+@pytest.fixture
+def fast_sleep(monkeypatch):
+    """Make retry waits instant; returns the list of requested delays."""
+    delays = []
+    async def no_wait(delay, *args, **kwargs):
+        delays.append(delay)
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    monkeypatch.setattr(time, "sleep", delays.append)
+    return delays
+
+@pytest.fixture
+def clock():
+    """Manual clock for CircuitBreaker(clock=...); starts at 1000s."""
+    now = [1000.0]
+    def advance(seconds):
+        now[0] += seconds
+    return SimpleNamespace(now=lambda: now[0], advance=advance)
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """Stub the Ollama HTTP API behind aiohttp.ClientSession.
+
+    Set ``ollama.routes[path]`` to a function taking the request payload and
+    returning ``(status, body)``; unrouted paths answer 404. Each request
+    is recorded in ``ollama.requests`` as ``(path, payload)``.
+    """
+    stub = SimpleNamespace(routes={}, requests=[])
+
+    class Response:
+        def __init__(self, status, body):
+            self.status = status
+            self._body = body
+        async def json(self):
+            return self._body
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, *exc_info):
+            return False
+
+    class Session:
+        def __init__(self, *args, **kwargs):
+            pass
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, *exc_info):
+            return False
+        def post(self, url, json):
+            path = urlparse(url).path
+            stub.requests.append((path, json))
+            route = stub.routes.get(path)
+            status, body = route(json) if route else (404, {"error": "not found"})
+            return Response(status, body)
+
+    monkeypatch.setattr(aiohttp, "ClientSession", Session)
+    return stub
 
 def test_cache_operations():
     """Test cache operations."""
@@ -41,18 +111,17 @@ def test_cache_operations():
     assert cache.get("key5") is None
     assert cache.get("key6") is None
 
-@pytest.mark.asyncio
-async def test_retry_decorator():
+async def test_retry_decorator(fast_sleep):
     """Test retry decorator for async functions."""
     attempt_count = 0
     
-    @retry_async(max_attempts=3, delay=0.1)
+    @retry_async(max_attempts=3, delay=0.01)
     async def failing_function():
         nonlocal attempt_count
         attempt_count += 1
         raise ValueError("Test error")
     
-    @retry_async(max_attempts=3, delay=0.1)
+    @retry_async(max_attempts=3, delay=0.01)
     async def succeeding_function():
         nonlocal attempt_count
         attempt_count += 1
@@ -64,6 +133,7 @@ async def test_retry_decorator():
     with pytest.raises(ValueError):
         await failing_function()
     assert attempt_count == 3  # Should have tried 3 times
+    assert fast_sleep == [0.01, 0.01]  # Waited between attempts only
     
     # Reset counter and test function that succeeds on second try
     attempt_count = 0
@@ -71,6 +141,23 @@ async def test_retry_decorator():
     assert result == "success"
     assert attempt_count == 2  # Should have succeeded on second try
 
+def test_retry_decorator_sync(fast_sleep):
+    """Test retry decorator applied to a synchronous function."""
+    attempt_count = 0
+    
+    @retry_async(max_attempts=3, delay=0.01)
+    def succeeding_function():
+        nonlocal attempt_count
+        attempt_count += 1
+        if attempt_count < 2:
+            raise ValueError("Test error")
+        return "success"
+    
+    # Returns the value directly rather than a coroutine
+    assert succeeding_function() == "success"
+    assert attempt_count == 2
+    assert fast_sleep == [0.01]
+
 def test_strip_comments():
     """Test comment stripping from diagram code."""
     # Test Mermaid comments
@@ -164,15 +251,28 @@ def test_cache_concurrent_access():
     assert value == "value"
     assert cache.get("del_key") is None
 
-@pytest.mark.asyncio
-async def test_retry_with_custom_exceptions():
+def test_cache_maxsize_evicts_least_recently_used():
+    """Test that a bounded cache evicts the least recently used entry."""
+    cache = Cache(maxsize=2)
+    
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now more recent than "b"
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+async def test_retry_with_custom_exceptions(fast_sleep):
     """Test retry decorator with specific exceptions."""
     
-    @retry_async(max_attempts=3, delay=0.1, exceptions=(ValueError,))
+    @retry_async(max_attempts=3, delay=0.01, exceptions=(ValueError,))
     async def value_error_function():
         raise ValueError("Expected error")
     
-    @retry_async(max_attempts=3, delay=0.1, exceptions=(ValueError,))
+    @retry_async(max_attempts=3, delay=0.01, exceptions=(ValueError,))
     async def type_error_function():
         raise TypeError("Unexpected error")
     
@@ -184,6 +284,137 @@ async def test_retry_with_custom_exceptions():
     with pytest.raises(TypeError):
         await type_error_function()
 
+async def test_retry_fast_paths(fast_sleep):
+    """Test that non-matching errors and zero delays skip retries and sleeps."""
+    attempt_count = 0
+    
+    @retry_async(max_attempts=3, delay=10.0, exceptions=(ValueError,))
+    async def type_error_function():
+        nonlocal attempt_count
+        attempt_count += 1
+        raise TypeError("Unexpected error")
+    
+    @retry_async(max_attempts=3, delay=0)
+    async def zero_delay_function():
+        nonlocal attempt_count
+        attempt_count += 1
+        raise ValueError("Test error")
+    
+    # Non-matching exception propagates on the first attempt, without the 10s wait
+    with pytest.raises(TypeError):
+        await type_error_function()
+    assert attempt_count == 1
+    assert not fast_sleep
+    
+    # Zero delay still retries the full number of attempts, without sleeping
+    attempt_count = 0
+    with pytest.raises(ValueError):
+        await zero_delay_function()
+    assert attempt_count == 3
+    assert not fast_sleep
+
+async def test_retry_max_delay_without_backoff(fast_sleep):
+    """Test retry_async caps its waits at max_delay with the default backoff."""
+    @retry_async(max_attempts=3, delay=5.0, max_delay=1.0)
+    async def failing_function():
+        raise ValueError("Test error")
+    
+    with pytest.raises(ValueError):
+        await failing_function()
+    assert fast_sleep == [1.0, 1.0]
+
+def test_retry_backoff_and_jitter():
+    """Test retry delay growth, capping and jitter bounds."""
+    # Exponential backoff with a custom factor, capped at max_delay
+    config = RetryConfig(base_delay=0.01, max_delay=0.05, backoff_factor=3.0)
+    assert config.get_delay(1) == pytest.approx(0.01)
+    assert config.get_delay(2) == pytest.approx(0.03)
+    assert config.get_delay(3) == pytest.approx(0.05)
+    
+    # A fixed delay is capped as well
+    config = RetryConfig(base_delay=5.0, max_delay=1.0, exponential_backoff=False)
+    assert config.get_delay(1) == config.get_delay(3) == 1.0
+    
+    # Jitter stays within bounds and never goes negative
+    config = RetryConfig(base_delay=0.01, exponential_backoff=False, jitter=0.02)
+    delays = [config.get_delay(1) for _ in range(200)]
+    lowest, highest = min(delays), max(delays)
+    assert 0.0 <= lowest < highest <= 0.03
+
+def test_circuit_breaker_timeouts(clock):
+    """Test the circuit breaker opens, half-opens and resets on its clock."""
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=60.0, half_open_timeout=30.0, clock=clock.now
+    )
+    
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "OPEN"
+    assert not breaker.can_execute()
+    
+    # A test request is allowed once the half-open timeout has passed
+    clock.advance(31.0)
+    assert breaker.can_execute()
+    assert breaker.state == "HALF_OPEN"
+    
+    # Failures older than the reset timeout are forgotten
+    clock.advance(61.0)
+    breaker.record_failure()
+    assert breaker.failures == 1
+
+def test_diagram_cache_writes_through_by_default(tmp_path):
+    """Test entries reach disk as soon as they are set."""
+    cache = DiagramCache(str(tmp_path))
+    cache.set("login flow", "mermaid", "sequenceDiagram")
+    assert len(list(tmp_path.glob("*.json"))) == 1
+    assert DiagramCache(str(tmp_path)).get("login flow", "mermaid").value == "sequenceDiagram"
+
+def test_diagram_cache_bounds_memory(tmp_path):
+    """Test in-memory entries are capped without losing buffered ones."""
+    cache = DiagramCache(str(tmp_path), flush_threshold=10, max_hot_entries=2)
+    for i in range(3):
+        cache.set(f"diagram {i}", "mermaid", f"graph TD\nA{i}")
+    assert len(cache._hot) == 2
+    assert not list(tmp_path.glob("*.json"))
+    assert [cache.get(f"diagram {i}", "mermaid").value for i in range(3)] == [
+        f"graph TD\nA{i}" for i in range(3)
+    ]
+    
+    assert cache.flush() == 3
+    assert len(list(tmp_path.glob("*.json"))) == 3
+
+def test_diagram_cache_concurrent_writes(tmp_path):
+    """Test concurrent writes of one key and clears do not fail each other."""
+    cache = DiagramCache(str(tmp_path))
+    errors = []
+    
+    def writer(n):
+        try:
+            for i in range(30):
+                cache.set("login flow", "mermaid", f"graph TD\nA{n}-{i}")
+                if n == 0 and i % 10 == 0:
+                    cache.clear()
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert not list(tmp_path.glob("*.tmp"))
+    assert DiagramCache(str(tmp_path)).get("login flow", "mermaid").value.startswith("graph TD")
+
+def test_diagram_cache_finalizer_tolerates_missing_dir(tmp_path):
+    """Test the exit-time flush does not raise once the directory is gone."""
+    cache = DiagramCache(str(tmp_path / "diagrams"), flush_threshold=10)
+    cache.set("login flow", "mermaid", "sequenceDiagram")
+    shutil.rmtree(tmp_path / "diagrams")
+    cache._finalizer()
+    assert not cache._finalizer.alive
+
 def test_strip_comments_edge_cases():
     """Test comment stripping with edge cases."""
     # Empty input
@@ -208,3 +439,163 @@ def test_strip_comments_edge_cases():
     assert "Comment" not in clean
     assert "sequenceDiagram" in clean
     assert "A->B: Message" in clean
+
+async def test_rag_context_ranking(monkeypatch):
+    """Test documents are ranked by cosine similarity to the query."""
+    provider = RAGProvider(RAGConfig(similarity_threshold=0.2, max_documents=2))
+    embeddings = {
+        "orthogonal": [0.0, 1.0],
+        "close": [3.0, 1.0],
+        "exact": [2.0, 0.0],
+        "zero": [0.0, 0.0],
+        "tied": [1.0, 0.0],
+    }
+    provider.documents = [
+        EmbeddedDocument(content=name, metadata=DocumentMetadata(source=name), embedding=vector)
+        for name, vector in embeddings.items()
+    ]
+
+    async def query_embedding(query):
+        return [1.0, 0.0]
+    monkeypatch.setattr(provider, "_get_query_embedding", query_embedding)
+
+    result = await provider.get_relevant_context("query")
+    assert [doc.content for doc in result.documents] == ["exact", "tied"]
+
+    # Scores are rebuilt when documents are added after a search
+    provider.documents.append(
+        EmbeddedDocument(content="late", metadata=DocumentMetadata(source="late"), embedding=[5.0, 0.0])
+    )
+    provider.max_documents = 5
+    result = await provider.get_relevant_context("query")
+    assert [doc.content for doc in result.documents] == ["exact", "tied", "late", "close"]
+
+    # Replacing the documents drops the scores of the old ones, even when
+    # the count is unchanged
+    provider.documents = provider.documents[::-1]
+    result = await provider.get_relevant_context("query")
+    assert [doc.content for doc in result.documents] == ["late", "tied", "exact", "close"]
+
+async def test_rag_context_mismatched_embeddings(monkeypatch):
+    """Test embeddings of the wrong length score 0 instead of failing the search."""
+    provider = RAGProvider(RAGConfig(similarity_threshold=0.2))
+    embeddings = {
+        "match": [1.0, 0.0],
+        "longer": [1.0, 0.0, 0.0],
+        "close": [3.0, 1.0],
+        "shorter": [1.0],
+    }
+    provider.documents = [
+        EmbeddedDocument(content=name, metadata=DocumentMetadata(source=name), embedding=vector)
+        for name, vector in embeddings.items()
+    ]
+
+    async def query_embedding(query):
+        return [1.0, 0.0]
+    monkeypatch.setattr(provider, "_get_query_embedding", query_embedding)
+
+    result = await provider.get_relevant_context("query")
+    assert [doc.content for doc in result.documents] == ["match", "close"]
+
+def _embed_each(payload):
+    """Stub /api/embeddings: embed a prompt as [length, 1]."""
+    return 200, {"embedding": [float(len(payload["prompt"])), 1.0]}
+
+async def test_rag_embed_documents_batches(ollama):
+    """Test documents are embedded in batches with the configured model."""
+    provider = RAGProvider(RAGConfig(embedding_model="custom-embed"))
+    ollama.routes["/api/embed"] = lambda payload: (
+        200, {"embeddings": [[float(len(text)), 0.0] for text in payload["input"]]}
+    )
+    docs = [Document(content="a" * size) for size in (1, 2, 3)]
+
+    embedded = await provider._embed_documents(docs, batch_size=2)
+    assert [doc.embedding for doc in embedded] == [[1.0, 0.0], [2.0, 0.0], [3.0, 0.0]]
+    assert [(path, len(payload["input"])) for path, payload in ollama.requests] == [
+        ("/api/embed", 2), ("/api/embed", 1)
+    ]
+    assert {payload["model"] for _, payload in ollama.requests} == {"custom-embed"}
+    assert provider.stats.embedding_requests == 2
+
+def _raise_connection_error(payload):
+    raise aiohttp.ClientConnectionError("connection refused")
+
+@pytest.mark.parametrize("embed_route", [
+    pytest.param(None, id="missing-endpoint"),
+    pytest.param(_raise_connection_error, id="request-error"),
+    pytest.param(lambda payload: (200, {"embeddings": [[1.0, 0.0]]}), id="short-list"),
+])
+async def test_rag_embed_documents_fallback(ollama, embed_route):
+    """Test a failed batch is embedded one document at a time."""
+    provider = RAGProvider(RAGConfig(embedding_model="custom-embed"))
+    if embed_route:
+        ollama.routes["/api/embed"] = embed_route
+    ollama.routes["/api/embeddings"] = _embed_each
+    docs = [Document(content="a" * size) for size in (1, 2)]
+
+    embedded = await provider._embed_documents(docs)
+    assert [doc.embedding for doc in embedded] == [[1.0, 1.0], [2.0, 1.0]]
+    fallback = [payload for path, payload in ollama.requests if path == "/api/embeddings"]
+    assert [payload["prompt"] for payload in fallback] == ["a", "aa"]
+    assert {payload["model"] for payload in fallback} == {"custom-embed"}
+
+@pytest.fixture
+def rag_docs(tmp_path, monkeypatch):
+    """Documents directory plus a factory for providers that record embeddings.
+
+    ``rag_docs.provider(model)`` returns a provider caching under its own
+    directory whose ``_embed_documents`` appends the embedded sources to
+    ``rag_docs.embedded`` instead of calling Ollama.
+    """
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    (docs_dir / "a.py").write_text("print('first file')")
+    (docs_dir / "b.py").write_text("print('second file')")
+    embedded = []
+
+    async def embed_documents(docs, batch_size=None):
+        embedded.extend(doc.metadata.source for doc in docs)
+        return [
+            EmbeddedDocument(content=doc.content, metadata=doc.metadata, embedding=[1.0, 0.0])
+            for doc in docs
+        ]
+
+    def provider(model="nomic-embed-text"):
+        rag = RAGProvider(RAGConfig(embedding_model=model), cache_dir=str(tmp_path / "cache"))
+        monkeypatch.setattr(rag, "_embed_documents", embed_documents)
+        return rag
+
+    return SimpleNamespace(dir=docs_dir, embedded=embedded, provider=provider)
+
+async def test_rag_manifest_reuses_embeddings(rag_docs):
+    """Test unchanged files reuse embeddings saved outside the docs directory."""
+    assert await rag_docs.provider().load_docs_from_directory(str(rag_docs.dir), use_simple_file_splitting=True)
+    assert sorted(rag_docs.embedded) == ["a.py", "b.py"]
+    assert sorted(os.listdir(rag_docs.dir)) == ["a.py", "b.py"]
+
+    rag_docs.embedded.clear()
+    provider = rag_docs.provider()
+    assert await provider.load_docs_from_directory(str(rag_docs.dir), use_simple_file_splitting=True)
+    assert rag_docs.embedded == []
+    assert sorted(doc.metadata.source for doc in provider.documents) == ["a.py", "b.py"]
+
+@pytest.mark.parametrize("change", [
+    pytest.param(lambda path: path.write_text("print('edited first file')"), id="size"),
+    pytest.param(lambda path: os.utime(path, ns=(0, path.stat().st_mtime_ns + 1)), id="mtime"),
+])
+async def test_rag_manifest_invalidated_by_file_change(rag_docs, change):
+    """Test a file whose size or mtime changed is embedded again."""
+    await rag_docs.provider().load_docs_from_directory(str(rag_docs.dir), use_simple_file_splitting=True)
+    rag_docs.embedded.clear()
+
+    change(rag_docs.dir / "a.py")
+    await rag_docs.provider().load_docs_from_directory(str(rag_docs.dir), use_simple_file_splitting=True)
+    assert rag_docs.embedded == ["a.py"]
+
+async def test_rag_manifest_invalidated_by_model_change(rag_docs):
+    """Test embeddings from another model are not reused."""
+    await rag_docs.provider().load_docs_from_directory(str(rag_docs.dir), use_simple_file_splitting=True)
+    rag_docs.embedded.clear()
+
+    await rag_docs.provider("other-embed").load_docs_from_directory(str(rag_docs.dir), use_simple_file_splitting=True)
+    assert sorted(rag_docs.embedded) == ["a.py", "b.py"]